@@ -11,6 +11,8 @@ HOW IT WORKS:
   4. Embeds all documents using OpenAI's text-embedding-3-small model.
   5. Stores the embeddings + metadata in a ChromaDB persistent collection
      with cosine similarity indexing.
+  6. Builds the classifier's category centroids (classifier.py) so they
+     are cached on disk alongside the vector DB.
 
 WHY A VECTOR DB?
   - Enables semantic search: "leadership skills for finance" will match
@@ -18,57 +20,180 @@ WHY A VECTOR DB?
   - ChromaDB stores everything locally on disk — no external DB server needed.
   - The pre-built index makes vector search fast at query time.
 
-NOTE: This script is run ONCE during setup (or when programme data changes).
+NOTE: This script is run during setup and again whenever programme data
+changes — reruns only touch documents whose text actually changed.
 The resulting chroma_db/ folder is then used by the API server at runtime.
 
 USAGE:
-  python build_vectordb.py
+  python build_vectordb.py            # incremental update
+  python build_vectordb.py --clean    # full rebuild from scratch
 """
 
-import json
+import argparse
+import asyncio
+import hashlib
 import os
-import glob
-import time
+import random
+import re
+import sqlite3
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from operator import itemgetter
 import chromadb
-from chromadb.utils import embedding_functions
+import httpx
+import numpy as np
+import openai
+import orjson
+
+import classifier
+from recommender import iter_json_files
 
 # ── Path configuration ──────────────────────────────────────────────
 # PROGRAMME_PAGES_DIR : where the scraped JSON files live (one per programme)
 # CHROMA_DIR          : where the ChromaDB persistent database is stored
+# EMBED_CACHE_PATH    : SQLite file caching document embeddings between runs
 # COLLECTION_NAME     : name of the single collection inside ChromaDB
 PROGRAMME_PAGES_DIR = os.path.join(os.path.dirname(__file__), "programme_pages")
 CHROMA_DIR = os.path.join(os.path.dirname(__file__), "chroma_db")
+EMBED_CACHE_PATH = os.path.join(os.path.dirname(__file__), "embed_cache.sqlite")
 COLLECTION_NAME = "vlerick_programmes"
 
+# ── Embedding configuration ─────────────────────────────────────────
+# EMBEDDING_MODEL        : OpenAI model (fast, cheap, 1536-dim vectors)
+# BATCH_SIZE             : documents per embeddings request (the API accepts
+#                          up to 2048 inputs; bigger batches = fewer round-trips)
+# MAX_RETRIES            : attempts per batch before giving up
+# MAX_CONCURRENT_BATCHES : embedding requests allowed in flight at once
+# MAX_BACKOFF            : upper bound (seconds) on any single retry wait
+# START_JITTER           : max random delay (seconds) before a batch's first request
+EMBEDDING_MODEL = "text-embedding-3-small"
+BATCH_SIZE = 128
+MAX_RETRIES = 3
+MAX_CONCURRENT_BATCHES = 8
+MAX_BACKOFF = 60
+START_JITTER = 0.25
+
+# ── HNSW index parameters ───────────────────────────────────────────
+# Chroma's defaults (M=16, construction_ef=100, search_ef=10) are tuned
+# for large collections. Ours is small (well under 1000 1536-dim
+# vectors), so we can afford a dense graph and wide search for recall:
+#   hnsw:M               : links per node — more links = higher recall,
+#                          more memory (32 vs default 16; ~256 B/vector)
+#   hnsw:construction_ef : candidate list size while building (200 vs 100)
+#                          — better graph quality, build time grows ~linearly
+#   hnsw:search_ef       : candidate list size at query time — 100 gives
+#                          near-exact recall at this size for ~ms latency
+# At this collection size the extra build cost is well under a second.
+# Chroma fixes these when the collection is created, so changing them
+# requires a rebuild with --clean.
+HNSW_METADATA = {
+    "hnsw:space": "cosine",  # use cosine distance for similarity
+    "hnsw:M": 32,
+    "hnsw:construction_ef": 200,
+    "hnsw:search_ef": 100,
+}
+
+
+# Top-level fields that build_document() / build_metadata() actually
+# read. Everything else (full_text, contact, ...) is dropped on load so
+# it doesn't sit in memory for the rest of the build.
+_KEPT_FIELDS = frozenset({
+    "title", "subtitle", "url", "key_facts", "description",
+    "sections", "foldable_sections", "testimonials",
+})
+
+
+def _load_one(path):
+    """
+    Load and validate a single programme JSON file.
+
+    Runs inside a worker thread of load_programmes(). Returns None for
+    files that aren't a dict (e.g. programmes_database.json which is an
+    array) or that contain an "error" key (scraping failures), so the
+    caller can filter them out.
+
+    Only the first few bytes are read before deciding: a file that doesn't
+    start with "{" can't be a programme, so the ~2 MB combined array dump
+    (and any empty file) is skipped without being parsed at all.
+
+    Args:
+        path : absolute path to a programme .json file
+
+    Returns:
+        The programme dict (restricted to _KEPT_FIELDS), or None if the
+        file should be skipped.
+    """
+    with open(path, "rb") as f:
+        head = f.read(64)
+        if not head.lstrip().startswith(b"{"):
+            return None
+        # orjson parses straight from bytes (C/SIMD decoder) — much faster
+        # than stdlib json on these long description/testimonial strings
+        data = orjson.loads(head + f.read())
+
+    # Skip files that had errors during scraping
+    if "error" in data:
+        return None
+
+    return {k: v for k, v in data.items() if k in _KEPT_FIELDS}
+
 
 def load_programmes():
     """
     Load all programme JSON files from the scraped data directory.
 
-    Scans programme_pages/ recursively for .json files. Skips any file
-    that isn't a dict (e.g. programmes_database.json which is an array)
-    or that contains an "error" key (scraping failures).
+    Walks programme_pages/ recursively for .json files and reads them
+    in parallel with a thread pool — the work is I/O-bound (open + read
+    + parse per file), so threads overlap the syscall latency nicely.
+    Results come back in the same order as the file list, so document
+    IDs stay deterministic between runs.
 
     Returns:
         List of programme dicts, each containing scraped fields like
         title, url, key_facts, description, sections, etc.
     """
-    programmes = []
-    json_files = glob.glob(os.path.join(PROGRAMME_PAGES_DIR, "**", "*.json"), recursive=True)
+    # Up to 16 worker threads (2 per core) — beyond that we just contend on disk
+    max_workers = min(16, (os.cpu_count() or 1) * 2)
+    with ThreadPoolExecutor(max_workers=max_workers) as ex:
+        results = list(ex.map(_load_one, iter_json_files(PROGRAMME_PAGES_DIR)))
 
-    for path in json_files:
-        with open(path, "r", encoding="utf-8") as f:
-            data = json.load(f)
+    return [data for data in results if data is not None]
 
-        # Skip files that had errors during scraping
-        if not isinstance(data, dict):
-            continue
-        if "error" in data:
-            continue
 
-        programmes.append(data)
+def _fingerprint(text):
+    """64-bit fingerprint of a string, used as a compact dedup key."""
+    return int.from_bytes(hashlib.blake2b(text.encode("utf-8"), digest_size=8).digest(), "little")
+
 
-    return programmes
+def _clean(value):
+    """Strip a scraped string field; missing/None/empty values become ""."""
+    return value.strip() if value else ""
+
+
+def _cap(text, limit):
+    """Truncate text to at most `limit` chars, slicing only when needed."""
+    return text if len(text) <= limit else text[:limit]
+
+
+# ── Programme schema fast path ──────────────────────────────────────
+# Every scraped programme has the same fixed set of top-level fields, so
+# build_document() fetches them all in one go: overlay the programme on
+# the defaults (one C-level dict merge) and pull the seven values out
+# with a single itemgetter call, instead of seven separate .get()s.
+_PROGRAMME_DEFAULTS = {
+    "title": "",
+    "subtitle": "",
+    "key_facts": {},
+    "description": "",
+    "sections": [],
+    "foldable_sections": [],
+    "testimonials": [],
+}
+_get_programme_fields = itemgetter(*_PROGRAMME_DEFAULTS)
+
+
+def _programme_fields(prog):
+    """Return the fixed programme fields as a tuple, defaulting missing keys."""
+    return _get_programme_fields({**_PROGRAMME_DEFAULTS, **prog})
 
 
 def build_document(prog):
@@ -80,8 +205,8 @@ def build_document(prog):
     the embedding — but we cap sections at 2000 chars and testimonials
     at 500 chars to keep document sizes reasonable.
 
-    Content is deduplicated using a set to avoid repeating the same
-    text from different scraped fields.
+    Content is deduplicated using a set of content fingerprints to avoid
+    repeating the same text from different scraped fields.
 
     Args:
         prog : a programme dict from load_programmes()
@@ -91,56 +216,75 @@ def build_document(prog):
         double newlines.
     """
     parts = []
+    (title, subtitle, kf, description,
+     sections, foldable_sections, testimonials) = _programme_fields(prog)
 
     # Programme title (most important for matching)
-    title = prog.get("title", "").strip()
+    title = _clean(title)
     if title:
         parts.append(f"Programme: {title}")
 
     # Subtitle (often contains a summary tagline)
-    subtitle = prog.get("subtitle", "").strip()
+    subtitle = _clean(subtitle)
     if subtitle:
         parts.append(f"Subtitle: {subtitle}")
 
     # Key facts (fee, format, location, etc.) — pipe-separated for readability
-    kf = prog.get("key_facts", {})
-    if kf:
-        facts = []
-        for k, v in kf.items():
-            facts.append(f"{k}: {v}")
+    facts = [f"{k}: {v}" for k, v in kf.items() if v]
+    if facts:
         parts.append("Key Facts: " + " | ".join(facts))
 
     # Main description
-    description = prog.get("description", "").strip()
+    description = _clean(description)
     if description:
         parts.append(f"Description: {description}")
 
-    # Programme content sections (deduplicated to avoid repeated text)
+    # Programme content sections (deduplicated to avoid repeated text).
+    # The set holds 8-byte fingerprints rather than the (up to multi-KB)
+    # section strings themselves.
     seen_content = set()
-    for section in prog.get("sections", []):
-        heading = section.get("heading", "").strip()
-        content = section.get("content", "").strip()
+    for section in sections:
+        heading = _clean(section.get("heading"))
+        content = _clean(section.get("content"))
         # Only include sections with meaningful content (>20 chars)
-        if content and content not in seen_content and len(content) > 20:
-            seen_content.add(content)
-            parts.append(f"{heading}: {content[:2000]}")  # cap at 2000 chars
+        if content and len(content) > 20 and (h := _fingerprint(content)) not in seen_content:
+            seen_content.add(h)
+            parts.append(heading + ": " + _cap(content, 2000))
 
     # Foldable sections (often contain detailed module breakdowns)
-    for fold in prog.get("foldable_sections", []):
-        fold = fold.strip()
-        if fold and fold not in seen_content and len(fold) > 20:
-            seen_content.add(fold)
-            parts.append(fold[:2000])
+    for fold in foldable_sections:
+        fold = _clean(fold)
+        if fold and len(fold) > 20 and (h := _fingerprint(fold)) not in seen_content:
+            seen_content.add(h)
+            parts.append(_cap(fold, 2000))
 
     # Testimonials from past participants
-    for t in prog.get("testimonials", []):
-        t = t.strip()
+    for t in testimonials:
+        t = _clean(t)
         if t and len(t) > 20:
-            parts.append(f"Testimonial: {t[:500]}")  # cap at 500 chars
+            parts.append("Testimonial: " + _cap(t, 500))
 
     return "\n\n".join(parts)
 
 
+# Captures the category slug from ".../programmes/programmes-in-<slug>/..."
+_CATEGORY_RE = re.compile(r"/programmes/programmes-in-([^/]*)")
+
+
+# Slug → display name, e.g. "accounting-finance" → "Accounting Finance".
+# There are only a dozen categories, so each name is computed once and
+# every other programme in that category reuses it.
+_category_names: dict[str, str] = {}
+
+
+def _category_name(slug):
+    """Title-case a category slug, memoised per slug."""
+    name = _category_names.get(slug)
+    if name is None:
+        name = _category_names[slug] = slug.replace("-", " ").title()
+    return name
+
+
 def build_metadata(prog):
     """
     Extract structured metadata for a programme document.
@@ -161,14 +305,12 @@ def build_metadata(prog):
     kf = prog.get("key_facts", {})
     url = prog.get("url", "")
 
-    # Extract category from URL path pattern
-    category = ""
-    if "/programmes/programmes-in-" in url:
-        cat_part = url.split("/programmes/programmes-in-")[1].split("/")[0]
-        category = cat_part.replace("-", " ").title()
+    # Extract category from URL path pattern (single precompiled scan)
+    m = _CATEGORY_RE.search(url)
+    category = _category_name(m.group(1)) if m else ""
 
     return {
-        "title": prog.get("title", "").strip(),
+        "title": _clean(prog.get("title")),
         "url": url,
         "category": category,
         "fee": kf.get("fee", ""),
@@ -178,103 +320,381 @@ def build_metadata(prog):
     }
 
 
-def main():
+# ── Persistent embedding cache ──────────────────────────────────────
+# Scraped content rarely changes between rebuilds, so we keep every
+# embedding we've paid for in a small SQLite table keyed by
+# (model, SHA-256 of the document text). On a rebuild only new or
+# edited documents are sent to the OpenAI API.
+#
+# Vectors are stored as float16 (3 KB per 1536-dim vector instead of
+# 6 KB) — cosine similarity is insensitive to that precision loss — and
+# widened back to float32 when read. The dtype is part of the table name
+# so a cache written with a different precision is never misread.
+CACHE_DTYPE = np.float16
+CACHE_TABLE = "embedding_cache_fp16"
+
+def open_embedding_cache(path=EMBED_CACHE_PATH):
+    """Open (and create if needed) the SQLite embedding cache."""
+    conn = sqlite3.connect(path)
+    conn.execute(
+        f"CREATE TABLE IF NOT EXISTS {CACHE_TABLE} ("
+        "hash TEXT NOT NULL, model TEXT NOT NULL, vec BLOB NOT NULL, "
+        "PRIMARY KEY (hash, model))"
+    )
+    return conn
+
+
+def doc_hash(doc):
+    """SHA-256 hex digest of a document's text (the cache key)."""
+    return hashlib.sha256(doc.encode("utf-8")).hexdigest()
+
+
+def doc_id(doc, meta):
+    """
+    Collection ID for a programme document.
+
+    Hashes the programme URL, the document text and its metadata, so two
+    programmes with identical text still get distinct IDs, and a metadata
+    change (which isn't in the text) gives a new ID and is re-upserted.
+    Embeddings stay cached by doc_hash(), so that doesn't re-embed anything.
+    """
+    key = meta["url"] + "\0" + doc + "\0" + orjson.dumps(meta, option=orjson.OPT_SORT_KEYS).decode()
+    return doc_hash(key)[:16]
+
+
+def load_cached_embeddings(conn, hashes):
+    """
+    Look up cached embeddings for a list of document hashes.
+
+    Args:
+        conn   : open SQLite connection from open_embedding_cache()
+        hashes : list of document hashes from doc_hash()
+
+    Returns:
+        Dict mapping hash → embedding (list of floats) for every hit.
     """
-    Main entry point — builds the vector database from scratch.
+    wanted = set(hashes)
+    rows = conn.execute(
+        f"SELECT hash, vec FROM {CACHE_TABLE} WHERE model = ?", (EMBEDDING_MODEL,)
+    )
+    return {
+        h: np.frombuffer(blob, dtype=CACHE_DTYPE).astype(np.float32).tolist()
+        for h, blob in rows if h in wanted
+    }
+
+
+def save_embeddings(conn, items):
+    """
+    Persist freshly computed embeddings to the cache.
+
+    Args:
+        conn  : open SQLite connection from open_embedding_cache()
+        items : iterable of (hash, embedding) pairs
+    """
+    conn.executemany(
+        f"INSERT OR REPLACE INTO {CACHE_TABLE} (hash, model, vec) VALUES (?, ?, ?)",
+        [(h, EMBEDDING_MODEL, np.asarray(vec, dtype=CACHE_DTYPE).tobytes()) for h, vec in items],
+    )
+    conn.commit()
+
+
+def _build_one(prog):
+    """
+    Build the (document, metadata) pair for one programme.
+
+    Runs in a worker process of main()'s ProcessPoolExecutor, so it must
+    stay a top-level (picklable) function.
+
+    Args:
+        prog : a programme dict from load_programmes()
+
+    Returns:
+        (doc, meta) tuple, or None if the programme produced no text.
+    """
+    doc = build_document(prog)
+    if not doc.strip():
+        return None
+    return doc, build_metadata(prog)
+
+
+def _retry_wait(error, attempt):
+    """
+    How long to sleep before retrying a failed embeddings request.
+
+    On a rate-limit error we honour the server's Retry-After header when
+    present; otherwise we fall back to exponential backoff (2s, 4s, 8s…).
+    Random jitter of up to half the wait is added either way so concurrent
+    batches that failed together spread their retries out instead of
+    stampeding back at the same instant, and the wait is capped at
+    MAX_BACKOFF seconds.
+
+    Args:
+        error   : the exception raised by the request
+        attempt : 1-based attempt number that just failed
+
+    Returns:
+        Seconds to wait (float).
+    """
+    wait = 2 ** attempt
+    if isinstance(error, openai.RateLimitError):
+        retry_after = error.response.headers.get("retry-after")
+        try:
+            wait = float(retry_after)
+        except (TypeError, ValueError):
+            pass  # missing or an HTTP-date — keep the exponential value
+    return min(MAX_BACKOFF, wait + random.uniform(0, wait / 2))
+
+
+async def embed_batch(client, sem, batch_no, texts):
+    """
+    Embed one batch of documents, retrying on transient API errors.
+
+    The semaphore bounds how many batches are in flight at once so we
+    stay within OpenAI's rate limits. Each batch is retried up to
+    MAX_RETRIES times, waiting as computed by _retry_wait().
+
+    Args:
+        client   : a shared openai.AsyncOpenAI client
+        sem      : asyncio.Semaphore limiting concurrent requests
+        batch_no : 1-based batch number (for progress logging)
+        texts    : list of document strings to embed
+
+    Returns:
+        List of embedding vectors (lists of floats), one per input text.
+    """
+    # Small random stagger so the first wave of batches doesn't hit the
+    # API in lockstep
+    await asyncio.sleep(random.uniform(0, START_JITTER))
+
+    async with sem:
+        for attempt in range(1, MAX_RETRIES + 1):
+            try:
+                response = await client.embeddings.create(model=EMBEDDING_MODEL, input=texts)
+                print(f"  Batch {batch_no} ({len(texts)} docs) embedded OK")
+                return [d.embedding for d in response.data]
+            except Exception as e:
+                print(f"  Batch {batch_no} attempt {attempt} failed: {e}")
+                if attempt == MAX_RETRIES:
+                    raise  # give up after 3 attempts
+                wait = _retry_wait(e, attempt)
+                print(f"  Retrying in {wait:.1f}s...")
+                await asyncio.sleep(wait)
+
+
+async def embed_documents(documents, api_key):
+    """
+    Embed every document, submitting batches concurrently.
+
+    Documents are sorted by length first so each batch holds similarly
+    sized texts (less tail latency from one huge document per batch),
+    then split into BATCH_SIZE chunks and fired via asyncio.gather, with
+    at most MAX_CONCURRENT_BATCHES requests in flight. The vectors are
+    scattered back to their original positions at the end.
+
+    Args:
+        documents : list of document strings
+        api_key   : OpenAI API key
+
+    Returns:
+        List of embedding vectors, in the same order as documents.
+    """
+    sem = asyncio.Semaphore(MAX_CONCURRENT_BATCHES)
+
+    # Indices of documents ordered by length (shortest first)
+    order = sorted(range(len(documents)), key=lambda i: len(documents[i]))
+    sorted_docs = [documents[i] for i in order]
+
+    # One client (and one HTTP/2 connection pool) shared by every batch,
+    # so concurrent requests reuse open connections instead of paying a
+    # TLS handshake each.
+    http_client = httpx.AsyncClient(
+        http2=True,
+        limits=httpx.Limits(max_connections=32, max_keepalive_connections=16),
+    )
+    async with openai.AsyncOpenAI(api_key=api_key, http_client=http_client) as client:
+        tasks = [
+            embed_batch(client, sem, start // BATCH_SIZE + 1, sorted_docs[start:start + BATCH_SIZE])
+            for start in range(0, len(sorted_docs), BATCH_SIZE)
+        ]
+        batches = await asyncio.gather(*tasks)
+
+    # Put each vector back at its document's original index
+    embeddings = [None] * len(documents)
+    vectors = (vec for batch in batches for vec in batch)
+    for i, vec in zip(order, vectors):
+        embeddings[i] = vec
+    return embeddings
+
+
+def main(clean=False):
+    """
+    Main entry point — builds (or incrementally updates) the vector database.
+
+    Documents are stored under content-addressed IDs (a prefix of the
+    SHA-256 of their URL, text and metadata — see doc_id), so a rerun only
+    has to insert programmes that changed and remove ones that
+    disappeared — unchanged documents are left untouched in the index.
 
     Steps:
       1. Load all programme JSON files from disk.
-      2. Set up ChromaDB with OpenAI's text-embedding-3-small model.
-      3. Delete any existing collection (clean rebuild each time).
+      2. Set up ChromaDB (no embedding function — we supply the vectors).
+      3. Open the existing collection (or delete it first if clean=True).
       4. Build text documents + metadata for each programme.
-      5. Embed and store in batches of 20, with retry logic for API errors.
+      5. Reuse cached embeddings for unchanged documents; embed the rest
+         concurrently (with retry logic for API errors).
+      6. Upsert new documents + precomputed vectors and drop stale ones.
+      7. Build and persist the classifier's category centroids.
+
+    Args:
+        clean : if True, delete the collection and rebuild from scratch.
     """
     print("Loading scraped programme data...")
     programmes = load_programmes()
     print(f"  Found {len(programmes)} programmes\n")
 
-    # ── Set up ChromaDB with OpenAI embeddings ──────────────────────
-    # ChromaDB's OpenAI integration looks for CHROMA_OPENAI_API_KEY by default.
-    # We fall back from OPENAI_API_KEY if CHROMA_OPENAI_API_KEY isn't set.
+    # ── Set up ChromaDB ─────────────────────────────────────────────
+    # We compute every embedding ourselves (see embed_documents), so the
+    # collection has no embedding function: Chroma only stores vectors
+    # and builds the HNSW index, never calling OpenAI on its own. Anyone
+    # querying the collection must pass query_embeddings from the same
+    # EMBEDDING_MODEL.
     api_key = os.environ.get("OPENAI_API_KEY", "")
-    if api_key and not os.environ.get("CHROMA_OPENAI_API_KEY"):
-        os.environ["CHROMA_OPENAI_API_KEY"] = api_key
-    print("Initializing ChromaDB with OpenAI embeddings...")
-    ef = embedding_functions.OpenAIEmbeddingFunction(
-        api_key=api_key,
-        model_name="text-embedding-3-small",  # fast, cheap, 1536-dim vectors
+    print("Initializing ChromaDB...")
+
+    # PersistentClient saves the DB to disk so it survives server restarts.
+    # Telemetry is off (no extra network call per write) and reset is
+    # allowed so --clean can wipe the store in one operation.
+    client = chromadb.PersistentClient(
+        path=CHROMA_DIR,
+        settings=chromadb.Settings(anonymized_telemetry=False, allow_reset=True),
     )
 
-    # PersistentClient saves the DB to disk so it survives server restarts
-    client = chromadb.PersistentClient(path=CHROMA_DIR)
+    # --clean: wipe the store for a full rebuild. reset() drops everything
+    # in one go instead of deleting the collection's rows/segments.
+    if clean:
+        client.reset()
 
-    # Delete existing collection if it exists (clean rebuild each time)
-    try:
-        client.delete_collection(COLLECTION_NAME)
-    except Exception:
-        pass
-
-    # Create a new collection with cosine similarity indexing
-    # HNSW (Hierarchical Navigable Small World) is the underlying
-    # approximate nearest-neighbor algorithm used by ChromaDB.
-    collection = client.create_collection(
+    # Open the collection, creating it with cosine similarity indexing
+    # if it doesn't exist yet. HNSW (Hierarchical Navigable Small World)
+    # is the underlying approximate nearest-neighbor algorithm used by
+    # ChromaDB.
+    collection = client.get_or_create_collection(
         name=COLLECTION_NAME,
-        embedding_function=ef,
-        metadata={"hnsw:space": "cosine"},  # use cosine distance for similarity
+        embedding_function=None,
+        metadata=HNSW_METADATA,
     )
 
     # ── Build documents and metadata ────────────────────────────────
-    documents = []
-    metadatas = []
-    ids = []
-
-    for i, prog in enumerate(programmes):
-        doc = build_document(prog)
-        meta = build_metadata(prog)
-
-        if not doc.strip():
+    # Document construction is pure CPU work (string building, hashing),
+    # so fan it out across processes to sidestep the GIL. map() returns
+    # results in input order, which keeps the output deterministic.
+    with ProcessPoolExecutor() as ex:
+        built = list(ex.map(_build_one, programmes, chunksize=16))
+
+    # Three pre-sized columns (documents / metadatas / ids) filled by
+    # index, plus a mask of which rows are kept. Masking once at the end
+    # replaces per-item list appends, and the resulting arrays support
+    # fancy indexing when we pick out the rows to upsert below.
+    documents = np.empty(len(built), dtype=object)
+    metadatas = np.empty_like(documents)
+    ids = np.empty_like(documents)
+    valid = np.zeros(len(built), dtype=bool)
+    seen_ids = set()
+
+    for i, result in enumerate(built):
+        if result is None:
             continue
+        doc, meta = result
+
+        # Content-addressed ID: same programme + text + metadata → same ID
+        # across runs. Only a repeated copy of the same page collides.
+        prog_id = doc_id(doc, meta)
+        if prog_id in seen_ids:
+            continue  # same programme already added
+        seen_ids.add(prog_id)
 
-        documents.append(doc)
-        metadatas.append(meta)
-        ids.append(f"prog_{i}")
+        documents[i] = doc
+        metadatas[i] = meta
+        ids[i] = prog_id
+        valid[i] = True
 
         print(f"  [{i+1}/{len(programmes)}] {meta['title'][:50]}... "
               f"({len(doc)} chars, category: {meta['category']})")
 
-    # ── Embed and store in batches ──────────────────────────────────
-    # We batch in groups of 20 to avoid hitting OpenAI's rate limits.
-    # Each batch is retried up to 3 times with exponential backoff
-    # (2s, 4s, 8s) in case of transient API errors.
-    BATCH_SIZE = 20
-    MAX_RETRIES = 3
-    print(f"\nEmbedding {len(documents)} documents in batches of {BATCH_SIZE}...")
-
-    for start in range(0, len(documents), BATCH_SIZE):
-        end = min(start + BATCH_SIZE, len(documents))
-        batch_docs = documents[start:end]
-        batch_metas = metadatas[start:end]
-        batch_ids = ids[start:end]
-
-        for attempt in range(1, MAX_RETRIES + 1):
-            try:
-                collection.add(documents=batch_docs, metadatas=batch_metas, ids=batch_ids)
-                print(f"  Batch {start // BATCH_SIZE + 1} ({start+1}-{end}) embedded OK")
-                break
-            except Exception as e:
-                wait = 2 ** attempt  # exponential backoff: 2s, 4s, 8s
-                print(f"  Batch {start // BATCH_SIZE + 1} attempt {attempt} failed: {e}")
-                if attempt == MAX_RETRIES:
-                    raise  # give up after 3 attempts
-                print(f"  Retrying in {wait}s...")
-                time.sleep(wait)
+    documents = documents[valid]
+    metadatas = metadatas[valid]
+    ids = ids[valid]
+
+    # ── Diff against what's already indexed ─────────────────────────
+    # IDs already in the collection have identical text and metadata, so
+    # they need neither re-embedding nor re-insertion. IDs in the collection that
+    # no longer match any document are stale (programme edited/removed).
+    existing = set(collection.get(include=[])["ids"])
+    stale = existing - seen_ids
+    todo = np.array([i for i, prog_id in enumerate(ids) if prog_id not in existing], dtype=np.intp)
+    print(f"\n{len(ids) - len(todo)} documents unchanged, {len(todo)} to upsert, "
+          f"{len(stale)} stale to remove")
+
+    if stale:
+        collection.delete(ids=list(stale))
+
+    # ── Embed all batches concurrently ──────────────────────────────
+    # Instead of letting Chroma embed each batch synchronously (one
+    # OpenAI round-trip at a time), we precompute every embedding up
+    # front with concurrent requests, then hand the vectors to Chroma.
+    # Documents whose text hasn't changed since the last run are served
+    # from the on-disk embedding cache and never hit the API.
+    cache = open_embedding_cache()
+    hashes = [doc_hash(documents[i]) for i in todo]
+    cached = load_cached_embeddings(cache, hashes)
+    missing = [j for j, h in enumerate(hashes) if h not in cached]
+    print(f"{len(hashes) - len(missing)} embeddings found in cache, "
+          f"{len(missing)} documents to embed")
+
+    if missing:
+        print(f"Embedding {len(missing)} documents in batches of {BATCH_SIZE} "
+              f"({MAX_CONCURRENT_BATCHES} in flight)...")
+        fresh = asyncio.run(embed_documents(documents[todo[missing]].tolist(), api_key))
+        new_items = [(hashes[j], vec) for j, vec in zip(missing, fresh)]
+        save_embeddings(cache, new_items)
+        cached.update(new_items)
+    cache.close()
+
+    # ── Store in Chroma ─────────────────────────────────────────────
+    # With precomputed embeddings, upsert() is a cheap local write (no
+    # API call), so all new documents go in with a single call. Nothing
+    # here reads back from the collection; the single count() below
+    # runs once everything has been written.
+    if len(todo):
+        collection.upsert(
+            documents=documents[todo].tolist(),
+            embeddings=[cached[h] for h in hashes],
+            metadatas=metadatas[todo].tolist(),
+            ids=ids[todo].tolist(),
+        )
+
+    # ── Classifier centroids ────────────────────────────────────────
+    # The classifier embeds its category exemplars once and persists the
+    # centroids to disk. Doing that here means the embedding work happens
+    # at build time; the Dockerfile copies the centroids_*.npz file into
+    # the image, so a server built after this step loads it instead of
+    # re-embedding the exemplars on a cold start.
+    print("Building classifier category centroids...")
+    classifier.warm_centroids()
 
     print(f"\n{'=' * 50}")
     print(f"  Vector DB built successfully!")
     print(f"  Documents: {collection.count()}")
     print(f"  Location:  {CHROMA_DIR}")
+    print(f"  Centroids: {classifier.CENTROIDS_PATH}")
     print(f"{'=' * 50}")
 
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Build the programme vector DB.")
+    parser.add_argument(
+        "--clean", action="store_true",
+        help="delete the existing collection and rebuild from scratch",
+    )
+    args = parser.parse_args()
+    main(clean=args.clean)
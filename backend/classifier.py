@@ -1,6 +1,7 @@
 """
 Embedding-based classification of candidate career goals into Vlerick programme categories.
-Uses OpenAI text-embedding-3-small embeddings with cosine similarity against category exemplars.
+Uses OpenAI text-embedding-3-small embeddings (or, optionally, a local
+sentence-transformers model) with cosine similarity against category exemplars.
 
 HOW IT WORKS:
   1. We define 12 Vlerick programme categories, each with ~12 "exemplar"
@@ -18,16 +19,33 @@ WHY THIS APPROACH?
   - More nuanced than keyword matching — captures semantic meaning.
   - The exemplar phrases act as "training examples" that define each
     category's semantic region without needing labelled data.
-  - Centroids are cached after first computation, so subsequent calls
-    only need to embed the candidate text (1 API call).
+  - Centroids are cached after first computation (in memory and on disk),
+    so subsequent calls — even from a freshly started process — only need
+    to embed the candidate text (1 API call). Repeat submissions of the
+    same text are answered from an in-memory LRU cache with no API call.
   - Uses OpenAI's text-embedding-3-small model which is fast and cheap.
 
-This module is called by main.py (Step 3) to determine which programme
-categories best match the candidate before the recommendation step.
+LOCAL MODE (optional):
+  Set CLASSIFIER_EMBEDDINGS=local to embed with a small local model
+  (BAAI/bge-small-en-v1.5 by default, override with LOCAL_EMBEDDING_MODEL)
+  instead of calling OpenAI. This removes the network round-trip from
+  every classification (a few ms on CPU vs ~200ms), at the cost of
+  installing sentence-transformers (pip install sentence-transformers),
+  which is not in requirements.txt because it pulls in PyTorch.
+
+This module is called by main.py (Step 3, via aclassify_goals — the async
+twin of classify_goals) to determine which programme categories best
+match the candidate before the recommendation step.
 """
 
+import asyncio
+import hashlib
 import os
-from openai import OpenAI
+import re
+import threading
+from collections import OrderedDict
+import httpx
+from openai import AsyncOpenAI, OpenAI
 import numpy as np
 
 # ── The 12 Vlerick executive education categories ───────────────────
@@ -206,57 +224,317 @@ CATEGORY_EXEMPLARS: dict[str, list[str]] = {
     ],
 }
 
+# Category names in a fixed order — row i of the centroid matrix
+# belongs to CATEGORY_NAMES[i].
+CATEGORY_NAMES: list[str] = list(CATEGORY_EXEMPLARS)
+
+# ── On-disk centroid cache ──────────────────────────────────────────
+# The exemplars are static source code, so the centroids only change
+# when CATEGORY_EXEMPLARS (or the embedding model, its dimensions or int8 mode)
+# changes. We save the centroid matrix to an .npz file named after a
+# hash of all of these, so a fresh server process loads it from disk
+# instead of re-embedding 144 phrases.
+# Editing the exemplars changes the hash, which automatically misses the
+# old file.
+EMBEDDING_BACKEND = os.environ.get("CLASSIFIER_EMBEDDINGS", "openai").lower()
+if EMBEDDING_BACKEND == "local":
+    EMBEDDING_MODEL = os.environ.get("LOCAL_EMBEDDING_MODEL", "BAAI/bge-small-en-v1.5")
+    EMBEDDING_DIMENSIONS = None  # fixed by the local model
+    # Run the model's Linear layers in int8 (dynamic quantisation): about
+    # twice as fast on CPU and a quarter of the weight memory, with
+    # embeddings practically identical (cosine > 0.999 to float32). Set
+    # LOCAL_EMBEDDING_INT8=0 to keep full precision.
+    LOCAL_EMBEDDING_INT8 = os.environ.get("LOCAL_EMBEDDING_INT8", "1") != "0"
+else:
+    EMBEDDING_MODEL = "text-embedding-3-small"
+    # text-embedding-3 models can return shortened vectors (truncated and
+    # re-normalised server-side). 512 dims keeps the category ranking
+    # practically unchanged while cutting the response payload and the
+    # centroid matrix to a third of the full 1536.
+    EMBEDDING_DIMENSIONS = 512
+    LOCAL_EMBEDDING_INT8 = False
+_EXEMPLARS_KEY = hashlib.sha256(
+    repr((
+        EMBEDDING_MODEL, EMBEDDING_DIMENSIONS, LOCAL_EMBEDDING_INT8,
+        # Dict order, not sorted: centroid rows map to CATEGORY_NAMES by position
+        list(CATEGORY_EXEMPLARS.items()),
+    )).encode("utf-8")
+).hexdigest()[:12]
+CENTROIDS_PATH = os.path.join(os.path.dirname(__file__), f"centroids_{_EXEMPLARS_KEY}.npz")
+
 # ── Module-level cache ──────────────────────────────────────────────
 # Once we embed all 144 exemplar phrases and compute the 12 centroids,
 # we cache them here so we only pay for that API call once per server
 # lifetime. Subsequent classify_goals() calls reuse these centroids.
-_category_centroids: dict[str, np.ndarray] | None = None
+# Stored as a single (12, dim) matrix of unit-length rows, so scoring a
+# candidate is one matrix-vector product. The matrix is kept int8-
+# quantised (SQ8) with one float scale per row — a quarter of the
+# float32 footprint, in memory and on disk — see _quantize_rows().
+_category_centroids: tuple[np.ndarray, np.ndarray] | None = None
+# Held while building the centroids, so concurrent first requests (from
+# worker threads) wait for one build instead of each embedding all 144
+# exemplars.
+_centroids_lock = threading.Lock()
+
+# Per-text result cache — the same CV is often submitted more than once
+# (re-uploads, retries), and an identical classification input always
+# gets identical scores. We keep the last CLASSIFY_CACHE_SIZE score
+# vectors, keyed by a hash of the lowercased, whitespace-collapsed
+# text, so a repeat skips the embedding call entirely. Guarded by a
+# lock because classify_goals() may be called from worker threads.
+CLASSIFY_CACHE_SIZE = 1024
+_classify_cache: OrderedDict[bytes, np.ndarray] = OrderedDict()
+_classify_cache_lock = threading.Lock()
+
+
+# Shared OpenAI clients — created on first use and reused for every call,
+# so requests share one keep-alive (HTTP/2) connection pool instead of
+# opening a fresh TLS connection each time. The sync client serves
+# classify_goals(); the async one serves the async code path. The SDK
+# clients are safe to share across threads / tasks.
+_HTTP_TIMEOUT = httpx.Timeout(20.0, connect=5.0)
+_HTTP_LIMITS = httpx.Limits(max_connections=100, max_keepalive_connections=20)
+_MAX_RETRIES = 3
+_client: OpenAI | None = None
+_async_client: AsyncOpenAI | None = None
 
 
 def _get_client() -> OpenAI:
-    """Create an OpenAI client using the OPENAI_API_KEY env var."""
-    return OpenAI(api_key=os.environ.get("OPENAI_API_KEY"))
+    """Return the shared OpenAI client (uses the OPENAI_API_KEY env var)."""
+    global _client
+    if _client is None:
+        _client = OpenAI(
+            api_key=os.environ.get("OPENAI_API_KEY"),
+            max_retries=_MAX_RETRIES,
+            timeout=_HTTP_TIMEOUT,
+            http_client=httpx.Client(http2=True, timeout=_HTTP_TIMEOUT, limits=_HTTP_LIMITS),
+        )
+    return _client
+
+
+def _get_async_client() -> AsyncOpenAI:
+    """Return the shared AsyncOpenAI client (uses the OPENAI_API_KEY env var)."""
+    global _async_client
+    if _async_client is None:
+        _async_client = AsyncOpenAI(
+            api_key=os.environ.get("OPENAI_API_KEY"),
+            max_retries=_MAX_RETRIES,
+            timeout=_HTTP_TIMEOUT,
+            http_client=httpx.AsyncClient(http2=True, timeout=_HTTP_TIMEOUT, limits=_HTTP_LIMITS),
+        )
+    return _async_client
+
+
+# Local sentence-transformers model (CLASSIFIER_EMBEDDINGS=local only) —
+# loaded once on first use (under a lock, so it's only loaded once even
+# if several threads need it at the same time), then kept in memory for
+# the process lifetime.
+_local_model = None
+_local_model_lock = threading.Lock()
+
+
+def _get_local_model():
+    """Return the shared local embedding model, loading it on first use."""
+    global _local_model
+    if _local_model is None:
+        with _local_model_lock:
+            if _local_model is None:
+                from sentence_transformers import SentenceTransformer
+                model = SentenceTransformer(EMBEDDING_MODEL, device="cpu")
+                if LOCAL_EMBEDDING_INT8:
+                    import torch
+                    model = torch.ao.quantization.quantize_dynamic(
+                        model, {torch.nn.Linear}, dtype=torch.qint8,
+                    )
+                _local_model = model
+    return _local_model
+
+
+def _embed(texts: list[str]) -> np.ndarray:
+    """
+    Embed a list of text strings into vectors.
+
+    By default uses OpenAI's text-embedding-3-small model (OpenAI's
+    fastest/cheapest embedding model), shortened to EMBEDDING_DIMENSIONS
+    (512) dimensions instead of its native 1536.
+    With CLASSIFIER_EMBEDDINGS=local the texts are embedded in-process by
+    the local sentence-transformers model instead (384 dims for
+    bge-small), with no network call.
+
+    The vectors are written straight into one contiguous (N, dim)
+    float32 matrix — one allocation instead of one array per text, and
+    callers can slice rows out of it without copying.
+
+    Args:
+        texts : list of strings to embed
 
+    Returns:
+        2-D numpy array of shape (len(texts), dim), one row per input text.
+    """
+    if EMBEDDING_BACKEND == "local":
+        vectors = _get_local_model().encode(
+            texts, batch_size=len(texts), normalize_embeddings=True, convert_to_numpy=True,
+        )
+        return vectors.astype(np.float32, copy=False)
+
+    response = _get_client().embeddings.create(
+        model=EMBEDDING_MODEL, input=texts, dimensions=EMBEDDING_DIMENSIONS,
+    )
+    return _response_to_matrix(response)
+
+
+async def _aembed(texts: list[str]) -> np.ndarray:
+    """
+    Async version of _embed() — same output, without blocking the event loop.
 
-def _embed(client: OpenAI, texts: list[str]) -> list[np.ndarray]:
+    OpenAI calls go through the shared AsyncOpenAI client; the local
+    model (CPU-bound) runs in a worker thread.
     """
-    Embed a list of text strings into vectors using OpenAI's API.
+    if EMBEDDING_BACKEND == "local":
+        return await asyncio.to_thread(_embed, texts)
+
+    response = await _get_async_client().embeddings.create(
+        model=EMBEDDING_MODEL, input=texts, dimensions=EMBEDDING_DIMENSIONS,
+    )
+    return _response_to_matrix(response)
+
+
+# ── Micro-batching for concurrent requests ─────────────────────────
+# Each /recommend request embeds exactly one candidate text. Under load,
+# aclassify_goals() doesn't call the API directly: it queues its text and
+# a background task collects everything that arrives within MAX_WAIT
+# seconds (up to MAX_BATCH texts) into a single embeddings call, then
+# hands each waiter its own row. One request on its own only pays the
+# MAX_WAIT delay; N concurrent requests share one round-trip.
+MAX_BATCH = 32
+MAX_WAIT = 0.015
+_embed_queue: asyncio.Queue | None = None
+_batcher_task: asyncio.Task | None = None
+_inflight_batches: set[asyncio.Task] = set()
+
+
+async def _aembed_one(text: str) -> np.ndarray:
+    """Embed one text through the shared micro-batcher (see above)."""
+    global _embed_queue, _batcher_task
+    # The queue and task belong to the running event loop — (re)start
+    # them on first use, or if a previous loop has gone away.
+    loop = asyncio.get_running_loop()
+    if _batcher_task is None or _batcher_task.done() or _batcher_task.get_loop() is not loop:
+        _embed_queue = asyncio.Queue()
+        _batcher_task = asyncio.create_task(_run_batcher(_embed_queue))
+
+    future = loop.create_future()
+    _embed_queue.put_nowait((text, future))
+    return await future
+
+
+async def _run_batcher(queue: asyncio.Queue) -> None:
+    """Drain the queue forever, sending one embeddings call per batch."""
+    loop = asyncio.get_running_loop()
+    while True:
+        batch = [await queue.get()]
+        deadline = loop.time() + MAX_WAIT
+        while len(batch) < MAX_BATCH:
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+
+        # Embed in a separate task so the next batch can start collecting
+        # while this one is in flight.
+        task = asyncio.create_task(_embed_batch(batch))
+        _inflight_batches.add(task)
+        task.add_done_callback(_inflight_batches.discard)
+
+
+async def _embed_batch(batch: list[tuple[str, asyncio.Future]]) -> None:
+    """Embed one batch of queued texts and resolve each waiter's future."""
+    try:
+        matrix = await _aembed([text for text, _ in batch])
+    except Exception as exc:
+        for _, future in batch:
+            if not future.done():
+                future.set_exception(exc)
+        return
+
+    for row, (_, future) in zip(matrix, batch):
+        if not future.done():  # the waiting request may have been cancelled
+            future.set_result(row)
+
+
+def _response_to_matrix(response) -> np.ndarray:
+    """Copy an OpenAI embeddings response into one (N, dim) float32 matrix."""
+    out = np.empty((len(response.data), len(response.data[0].embedding)), dtype=np.float32)
+    for i, d in enumerate(response.data):
+        out[i] = d.embedding
+    return out
+
+
+def _quantize_rows(matrix: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Scalar-quantise each row of a float matrix to int8.
 
-    Uses the text-embedding-3-small model which produces 1536-dimensional
-    vectors. This is OpenAI's fastest/cheapest embedding model.
+    Each row gets its own scale (max |value| / 127) so the largest
+    component maps to ±127. A row is recovered as q.astype(float32) * scale.
+    For unit-length embeddings the resulting cosine error is well under
+    0.01 — far below the gaps between category scores.
 
     Args:
-        client : an initialised OpenAI client
-        texts  : list of strings to embed
+        matrix : 2-D float array
 
     Returns:
-        List of numpy arrays, one per input text.
+        (int8 matrix of the same shape, float32 per-row scales)
     """
-    response = client.embeddings.create(model="text-embedding-3-small", input=texts)
-    return [np.array(d.embedding, dtype=np.float32) for d in response.data]
+    scales = np.abs(matrix).max(axis=1) / 127
+    scales = np.where(scales == 0, 1, scales).astype(np.float32)
+    quantized = np.round(matrix / scales[:, None]).astype(np.int8)
+    return quantized, scales
 
 
-def _cosine_similarity(a: np.ndarray, b: np.ndarray) -> float:
+def _load_centroids() -> tuple[np.ndarray, np.ndarray] | None:
     """
-    Compute cosine similarity between two vectors.
+    Load the quantised centroid matrix + row scales from CENTROIDS_PATH.
 
-    Cosine similarity measures how similar two vectors are in direction
-    (ignoring magnitude). Returns a value between -1 and 1, where:
-      1.0  = identical direction (perfect match)
-      0.0  = orthogonal (no relationship)
-     -1.0  = opposite direction
+    Returns None when there's no usable file (never built, or built from
+    a different exemplar set / category order / corrupted), in which case
+    the caller rebuilds from the API. The file stores the category names
+    its rows belong to, so rows can never be read under the wrong label.
+    """
+    try:
+        with np.load(CENTROIDS_PATH) as data:
+            quantized, scales = data["centroids_q"], data["scales"]
+            names = data["names"].tolist()
+    except (OSError, KeyError, ValueError):
+        return None
+    if (names != CATEGORY_NAMES or quantized.shape[0] != len(names)
+            or quantized.dtype != np.int8):
+        return None
+    return quantized, scales
+
+
+def _save_centroids(quantized: np.ndarray, scales: np.ndarray) -> None:
+    """
+    Persist the quantised centroid matrix + row scales to CENTROIDS_PATH.
 
-    Handles zero vectors gracefully by returning 0.0.
+    Writes to a per-process temp file and renames it into place, so
+    several workers starting at once never see a half-written file —
+    whichever finishes last simply wins with identical contents. A
+    read-only filesystem just means we skip persisting.
     """
-    dot = np.dot(a, b)
-    norm_a = np.linalg.norm(a)
-    norm_b = np.linalg.norm(b)
-    if norm_a == 0 or norm_b == 0:
-        return 0.0
-    return float(dot / (norm_a * norm_b))
+    tmp_path = f"{CENTROIDS_PATH}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_path, "wb") as f:
+            np.savez(f, centroids_q=quantized, scales=scales,
+                     names=np.array(CATEGORY_NAMES))
+        os.replace(tmp_path, CENTROIDS_PATH)
+    except OSError:
+        pass
 
 
-def _build_centroids(client: OpenAI) -> dict[str, np.ndarray]:
+def _build_centroids() -> tuple[np.ndarray, np.ndarray]:
     """
     Embed all exemplar phrases and compute the mean centroid per category.
 
@@ -265,59 +543,116 @@ def _build_centroids(client: OpenAI) -> dict[str, np.ndarray]:
       2. Embed them all in ONE API call (efficient — stays under limits).
       3. Group the resulting vectors by category.
       4. Average (mean) each group to get a single centroid vector per category.
+      5. Stack the centroids into one matrix and normalise each row to unit
+         length, so cosine similarity later reduces to a plain dot product.
+      6. Quantise the matrix to int8 with a scale per row.
 
     The centroid represents the "semantic centre" of each category —
     candidate text that is close to a centroid in embedding space is
     a good fit for that category.
 
-    Results are cached in _category_centroids after first computation.
-
-    Args:
-        client : an initialised OpenAI client
+    Results are cached in _category_centroids after first computation,
+    and persisted to CENTROIDS_PATH so later processes can skip the
+    embedding call entirely (see _load_centroids / _save_centroids).
 
     Returns:
-        Dict mapping category name → centroid numpy array.
+        (quantized, scales): a (12, dim) int8 matrix whose row i is the
+        unit-length centroid of CATEGORY_NAMES[i], and its (12,) float32
+        per-row scales.
     """
     global _category_centroids
     if _category_centroids is not None:
         return _category_centroids
 
-    # Flatten all exemplars into one list, tracking which category each belongs to
-    all_phrases: list[str] = []
-    category_indices: list[tuple[str, int, int]] = []  # (category_name, start_idx, end_idx)
+    with _centroids_lock:
+        # Another thread may have finished the build while we waited
+        if _category_centroids is not None:
+            return _category_centroids
+
+        # A previous process may already have computed these centroids
+        centroids = _load_centroids()
+        if centroids is not None:
+            _category_centroids = centroids
+            return centroids
+
+        # Flatten all exemplars into one list, tracking where each category's
+        # phrases start and how many it has
+        all_phrases: list[str] = []
+        starts: list[int] = []
+        counts: list[int] = []
+
+        for phrases in CATEGORY_EXEMPLARS.values():
+            starts.append(len(all_phrases))
+            counts.append(len(phrases))
+            all_phrases.extend(phrases)
+
+        # Embed all 144 phrases in one API call (well within rate limits)
+        all_embeddings = _embed(all_phrases)
+
+        # Compute centroid (mean vector) for each category. Each category's
+        # rows are a contiguous run of the embedding matrix, so one
+        # np.add.reduceat sums every run in a single pass; dividing by the
+        # run lengths turns the sums into means.
+        centroids = np.add.reduceat(all_embeddings, starts, axis=0)
+        centroids /= np.asarray(counts, dtype=np.float32)[:, None]
+
+        # Normalise rows once here instead of on every classify_goals() call
+        norms = np.linalg.norm(centroids, axis=1, keepdims=True)
+        centroids /= np.where(norms == 0, 1, norms)
+
+        quantized, scales = _quantize_rows(centroids)
+        _save_centroids(quantized, scales)
+        _category_centroids = (quantized, scales)
+        return _category_centroids
+
+
+def warm_centroids() -> None:
+    """
+    Make sure the category centroids are built and persisted.
 
-    for category, phrases in CATEGORY_EXEMPLARS.items():
-        start = len(all_phrases)
-        all_phrases.extend(phrases)
-        end = len(all_phrases)
-        category_indices.append((category, start, end))
+    Loads them from CENTROIDS_PATH if present, otherwise embeds the
+    exemplars once and writes the file. Called by build_vectordb.py so
+    the one-off embedding work for both the programme index and the
+    classifier happens at build time; the server only skips it if the
+    file is shipped with it (the Dockerfile copies it when present).
+    """
+    _build_centroids()
 
-    # Embed all 144 phrases in one API call (well within rate limits)
-    all_embeddings = _embed(client, all_phrases)
 
-    # Compute centroid (mean vector) for each category
-    centroids: dict[str, np.ndarray] = {}
-    for category, start, end in category_indices:
-        category_embeddings = np.array(all_embeddings[start:end])
-        centroids[category] = np.mean(category_embeddings, axis=0)
+def warm_up() -> None:
+    """
+    Do all of the classifier's one-off setup ahead of the first request.
 
-    _category_centroids = centroids
-    return centroids
+    Creates the shared OpenAI clients (or loads the local model) and
+    loads/builds the category centroids. Called from main.py's startup
+    hook; anything that fails here is simply retried lazily on first use.
+    """
+    if EMBEDDING_BACKEND == "local":
+        _get_local_model()
+    else:
+        _get_client()
+        _get_async_client()
+    _build_centroids()
 
 
-def classify_goals(text: str, top_k: int = 3) -> list[dict]:
+def classify_goals(text: str | list[tuple[str, float]], top_k: int = 3) -> list[dict]:
     """
     Classify a candidate's career goals/profile text against the 12 Vlerick categories.
 
     Pipeline:
       1. Build (or retrieve cached) category centroid embeddings.
-      2. Embed the candidate's text into the same vector space.
-      3. Compute cosine similarity between the candidate vector and each centroid.
+      2. Embed the candidate's text into the same vector space. When given
+         several weighted parts, each part is embedded separately (in the
+         same API call) and the vectors are combined as a weighted sum.
+      3. Compute cosine similarity between the candidate vector and every
+         centroid in one matrix-vector product.
       4. Return the top-k categories sorted by similarity (highest first).
 
     Args:
-        text  : the candidate's career goals, skills, and background combined
-                into a single string.
+        text  : the candidate's career goals, skills, and background — either
+                combined into a single string, or as a list of
+                (text, weight) parts, e.g. [(goals, 2.0), (cv_excerpt, 1.0)].
+                Empty parts are ignored.
         top_k : how many top categories to return (default 3).
 
     Returns:
@@ -328,20 +663,149 @@ def classify_goals(text: str, top_k: int = 3) -> list[dict]:
             {"category": "Marketing & Sales",  "score": 0.5890},
         ]
     """
-    client = _get_client()
+    parts = _as_parts(text)
+    key = _cache_key(parts)
+    sims = _cached_scores(key)
+    if sims is None:
+        # Build or retrieve cached centroid vectors for all 12 categories
+        centroids = _build_centroids()
 
-    # Build or retrieve cached centroid vectors for all 12 categories
-    centroids = _build_centroids(client)
+        # Embed the candidate text into the same vector space
+        vectors = _embed([t for t, _ in parts]) if parts else None
+        sims = _score_candidate(centroids, _combine_parts(parts, vectors))
+        _store_scores(key, sims)
 
-    # Embed the candidate text into the same vector space
-    candidate_embedding = _embed(client, [text])[0]
+    return _top_categories(sims, top_k)
 
-    # Score the candidate against each category centroid
-    scores = []
-    for category, centroid in centroids.items():
-        similarity = _cosine_similarity(candidate_embedding, centroid)
-        scores.append({"category": category, "score": round(similarity, 4)})
 
-    # Sort by score descending and return the top-k
-    scores.sort(key=lambda x: x["score"], reverse=True)
-    return scores[:top_k]
+async def aclassify_goals(text: str | list[tuple[str, float]], top_k: int = 3) -> list[dict]:
+    """
+    Async version of classify_goals() — same inputs and output.
+
+    The candidate text is embedded via the AsyncOpenAI client, so main.py
+    can run classification concurrently with profile extraction; texts
+    from concurrent requests (and the parts of one request) are batched
+    into one call (_aembed_one). A cold centroid build (file missing →
+    144-phrase embedding call) runs in a worker thread so it doesn't
+    block the event loop either.
+    """
+    parts = _as_parts(text)
+    key = _cache_key(parts)
+    sims = _cached_scores(key)
+    if sims is None:
+        centroids = _category_centroids
+        if centroids is None:
+            centroids = await asyncio.to_thread(_build_centroids)
+
+        vectors = None
+        if parts:
+            vectors = np.stack(await asyncio.gather(*(_aembed_one(t) for t, _ in parts)))
+        sims = _score_candidate(centroids, _combine_parts(parts, vectors))
+        _store_scores(key, sims)
+
+    return _top_categories(sims, top_k)
+
+
+def _as_parts(text: str | list[tuple[str, float]]) -> list[tuple[str, float]]:
+    """Normalise classify input to a list of non-empty (text, weight) parts."""
+    if isinstance(text, str):
+        text = [(text, 1.0)]
+    return [(t.strip(), float(w)) for t, w in text if t and t.strip() and w]
+
+
+def _combine_parts(parts: list[tuple[str, float]], vectors: np.ndarray | None) -> np.ndarray:
+    """
+    Weighted sum of the part embeddings (one row per part).
+
+    Each row is unit length, so a part's weight is exactly its share of
+    the combined direction — e.g. weight 2.0 on the goals counts them
+    twice as much as a weight-1.0 CV excerpt. The result doesn't need
+    normalising: _score_candidate() does that. No parts → zero vector,
+    which scores 0.0 everywhere.
+    """
+    if vectors is None:
+        return np.zeros(1, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    vectors = vectors / np.where(norms == 0, 1, norms)
+    weights = np.asarray([w for _, w in parts], dtype=np.float32)
+    return weights @ vectors
+
+
+def _cache_key(parts: list[tuple[str, float]]) -> bytes:
+    """Hash of the parts, with case and whitespace differences removed."""
+    h = hashlib.sha256()
+    for text, weight in parts:
+        normalised = re.sub(r"\s+", " ", text.lower())
+        h.update(f"{weight!r}\x00{normalised}\x00".encode("utf-8"))
+    return h.digest()
+
+
+def _cached_scores(key: bytes) -> np.ndarray | None:
+    """Return the cached score vector for a key (marking it recently used)."""
+    with _classify_cache_lock:
+        sims = _classify_cache.get(key)
+        if sims is not None:
+            _classify_cache.move_to_end(key)
+        return sims
+
+
+def _store_scores(key: bytes, sims: np.ndarray) -> None:
+    """Cache a score vector, evicting the least recently used if full."""
+    sims.flags.writeable = False  # shared between requests — never mutate
+    with _classify_cache_lock:
+        _classify_cache[key] = sims
+        _classify_cache.move_to_end(key)
+        if len(_classify_cache) > CLASSIFY_CACHE_SIZE:
+            _classify_cache.popitem(last=False)
+
+
+def _score_candidate(
+    centroids: tuple[np.ndarray, np.ndarray],
+    candidate_embedding: np.ndarray,
+) -> np.ndarray:
+    """
+    Cosine similarity of a candidate vector against every category.
+
+    Args:
+        centroids           : (quantized, scales) from _build_centroids()
+        candidate_embedding : the candidate's embedding vector
+
+    Returns:
+        (12,) float32 array; entry i is the score for CATEGORY_NAMES[i].
+    """
+    centroids_q, scales = centroids
+
+    # Cosine similarity against all 12 centroids at once. The centroid rows
+    # are already unit length, so normalising the candidate vector and
+    # taking one matrix-vector product gives every cosine score. The
+    # candidate is quantised the same way as the centroids; the product
+    # runs on int32 (int8 × int8 sums over a few thousand dims can't overflow) and
+    # the scales turn it back into a cosine. A zero vector scores 0.0.
+    norm = np.linalg.norm(candidate_embedding)
+    if norm == 0:
+        return np.zeros(len(CATEGORY_NAMES), dtype=np.float32)
+    q, q_scale = _quantize_rows((candidate_embedding / norm)[None, :])
+    return (centroids_q.astype(np.int32) @ q[0].astype(np.int32)) * (scales * q_scale[0])
+
+
+def _top_categories(sims: np.ndarray, top_k: int) -> list[dict]:
+    """
+    Turn a score vector into the top-k {"category", "score"} dicts.
+
+    Args:
+        sims  : (12,) scores from _score_candidate()
+        top_k : how many categories to return
+
+    Returns:
+        List of {"category", "score"} dicts sorted by score descending.
+    """
+    # Pick the top-k with a partial sort (argpartition), then order just
+    # those k by score descending
+    k = min(top_k, len(sims))
+    top = np.argpartition(-sims, k - 1)[:k] if k > 0 else np.array([], dtype=int)
+    top = top[np.argsort(-sims[top])]
+
+    return [
+        {"category": CATEGORY_NAMES[i], "score": round(float(sims[i]), 4)}
+        for i in top
+    ]
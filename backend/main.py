@@ -2,36 +2,140 @@
 FastAPI backend for the Vlerick Programme Recommendation Tool.
 Endpoints:
   POST /recommend  - Upload CV + career goals → get recommendations + email
+  POST /recommend/stream - Same, streamed as NDJSON (profile first, then the
+                     recommendations as Claude writes them)
   GET  /programmes - List all programmes with metadata
   GET  /health     - Health check
 
 HOW THE FULL PIPELINE WORKS (when a user hits POST /recommend):
   Step 1 — PARSE:     parsers.py extracts raw text from the uploaded CV file.
   Step 2 — PROFILE:   profiler.py sends the CV text to Claude → structured JSON profile.
-  Step 3 — CLASSIFY:  classifier.py embeds the career goals via OpenAI embeddings and
-                       computes cosine similarity against 12 category centroids → top 3 categories.
+  Step 3 — CLASSIFY:  classifier.py embeds the career goals and the start of the CV via
+                       OpenAI embeddings, combines them (goals weighted double) and
+                       computes cosine similarity against 12 category centroids → top 3
+                       categories. Runs concurrently with Step 2.
   Step 4 — RECOMMEND: recommender.py sends the profile + categories + ALL programmes
                        to Claude → top 3 recommendations + personalised email draft.
 
 The frontend (Lovable app) calls these endpoints via the CORS-enabled API.
 """
 
-import json
+import asyncio
+import logging
 import os
-import glob
-from fastapi import FastAPI, UploadFile, File, Form
+import re
+from contextlib import asynccontextmanager
+import orjson
+from fastapi import FastAPI, UploadFile, File, Form, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 
 # Import our 4 pipeline modules
 from parsers import parse_file, parse_linkedin_url      # Step 1: file → raw text
-from profiler import extract_profile                     # Step 2: raw text → structured profile
-from classifier import classify_goals                    # Step 3: profile → top categories
+from profiler import aextract_profile                    # Step 2: raw text → structured profile
+from classifier import aclassify_goals                   # Step 3: goals + CV → top categories
 from recommender import recommend                        # Step 4: profile + categories → recommendations
+from recommender import astream_recommend                # Step 4, streamed (/recommend/stream)
+from recommender import iter_json_files                  # programme_pages/ walker (category list)
+from classifier import warm_up as warm_up_classifier     # startup: clients + centroids
+from profiler import warm_up as warm_up_profiler         # startup: Claude clients
+from recommender import warm_up as warm_up_recommender   # startup: catalogue cache + Claude client
+
+logger = logging.getLogger(__name__)
+
+# Path to the scraped programme JSON files (used by /programmes endpoint)
+PROGRAMME_PAGES_DIR = os.path.join(os.path.dirname(__file__), "programme_pages")
+
+# How much of the CV (in characters) is fed to the classifier alongside
+# the career goals — enough to capture the candidate's recent roles and
+# skills without diluting the goals.
+CLASSIFY_CV_CHARS = 2000
+
+# Weight of the career goals relative to the CV excerpt when classifying —
+# what the candidate wants next matters more than what they've done.
+CLASSIFY_GOALS_WEIGHT = 2.0
+
+
+# Category slug in a programme URL: ".../programmes/programmes-in-<slug>/..."
+_CATEGORY_RE = re.compile(r"/programmes/programmes-in-([^/]*)")
+
+
+def _load_programme_summaries() -> list[dict]:
+    """
+    Read every programme JSON file under programme_pages/ into a summary dict.
+
+    Returns:
+        List of {title, url, category, fee, format, location, description} dicts.
+    """
+    programmes = []
+    for path in iter_json_files(PROGRAMME_PAGES_DIR):
+        with open(path, "rb") as f:
+            data = orjson.loads(f.read())
+        # Skip non-dict entries (e.g. programmes_database.json array)
+        if not isinstance(data, dict):
+            continue
+        # Skip files that had scraping errors
+        if "error" in data:
+            continue
+        url = data.get("url", "")
+        key_facts = data.get("key_facts", {})
+        # Extract category from URL path: ".../programmes-in-strategy/..." → "Strategy"
+        match = _CATEGORY_RE.search(url)
+        programmes.append({
+            "title": data.get("title", ""),
+            "url": url,
+            "category": match.group(1).replace("-", " ").title() if match else "",
+            "fee": key_facts.get("fee", ""),
+            "format": key_facts.get("format", ""),
+            "location": key_facts.get("location", ""),
+            "description": data.get("description", "")[:200],  # first 200 chars only
+        })
+
+    return programmes
+
+
+# ── Startup ─────────────────────────────────────────────────────────
+# Everything the pipeline would otherwise set up lazily on the first
+# request is done here instead, so that request isn't slow and
+# concurrent first requests don't race to do the same work:
+#   - The programme files are baked into the image (see Dockerfile) and
+#     never change while the server is running, so we read them once and
+#     keep the serialised /programmes response in memory. Redeploying (or
+#     restarting) the server picks up a new scrape.
+#   - The recommender's programme catalogue is loaded into its cache.
+#   - The Anthropic/OpenAI clients and the classifier's category
+#     centroids are created.
+#   These warm-ups run in worker threads, side by side. If one fails
+#   (e.g. no API key at boot) the server still starts and that module
+#   falls back to initialising on first use.
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    programmes = _load_programme_summaries()
+    app.state.programmes_payload = orjson.dumps(
+        {"programmes": programmes, "count": len(programmes)}
+    )
+
+    warm_ups = {
+        "classifier": warm_up_classifier,
+        "profiler": warm_up_profiler,
+        "recommender": warm_up_recommender,
+    }
+    results = await asyncio.gather(
+        *(asyncio.to_thread(fn) for fn in warm_ups.values()),
+        return_exceptions=True,
+    )
+    for name, result in zip(warm_ups, results):
+        if isinstance(result, Exception):
+            logger.warning("%s warm-up failed, will retry on first request: %s", name.title(), result)
+
+    yield
+
 
 app = FastAPI(
     title="Vlerick Programme Recommender",
     description="AI-powered programme recommendations based on your CV and career goals",
     version="1.0.0",
+    lifespan=lifespan,
 )
 
 # ── CORS Middleware ─────────────────────────────────────────────────
@@ -46,9 +150,6 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Path to the scraped programme JSON files (used by /programmes endpoint)
-PROGRAMME_PAGES_DIR = os.path.join(os.path.dirname(__file__), "programme_pages")
-
 
 # ── Health Check ────────────────────────────────────────────────────
 @app.get("/health")
@@ -63,70 +164,51 @@ def list_programmes():
     """
     Return metadata for all programmes.
 
-    Scans every .json file under programme_pages/ and returns a summary
-    dict for each. Used by the frontend to display the programme catalogue.
+    Serves the catalogue loaded from programme_pages/ at startup (see
+    lifespan) — already serialised with orjson, so a request does no
+    disk reads or JSON encoding. Used by the frontend to display the
+    programme catalogue.
 
     Returns:
         JSON with "programmes" (list of dicts) and "count" (int).
     """
-    programmes = []
-    json_files = glob.glob(
-        os.path.join(PROGRAMME_PAGES_DIR, "**", "*.json"), recursive=True
-    )
+    return Response(app.state.programmes_payload, media_type="application/json")
 
-    for path in json_files:
-        with open(path, "r", encoding="utf-8") as f:
-            data = json.load(f)
-        # Skip non-dict entries (e.g. programmes_database.json array)
-        if not isinstance(data, dict):
-            continue
-        # Skip files that had scraping errors
-        if "error" in data:
-            continue
-        programmes.append({
-            "title": data.get("title", ""),
-            "url": data.get("url", ""),
-            # Extract category from URL path: ".../programmes-in-strategy/..." → "Strategy"
-            "category": data.get("url", "").split("/programmes/programmes-in-")[-1].split("/")[0].replace("-", " ").title()
-                if "/programmes/programmes-in-" in data.get("url", "") else "",
-            "fee": data.get("key_facts", {}).get("fee", ""),
-            "format": data.get("key_facts", {}).get("format", ""),
-            "location": data.get("key_facts", {}).get("location", ""),
-            "description": data.get("description", "")[:200],  # first 200 chars only
-        })
 
-    return {"programmes": programmes, "count": len(programmes)}
-
-
-# ── Main Recommendation Endpoint ────────────────────────────────────
-@app.post("/recommend")
-async def get_recommendations(
-    file: UploadFile = File(None),        # optional CV file upload
-    career_goals: str = Form(""),         # optional free-text career goals
-    linkedin_url: str = Form(""),         # optional LinkedIn profile URL
-):
+# ── Steps 1-3 (shared by both recommendation endpoints) ─────────────
+async def _analyse_candidate(
+    file: UploadFile | None, career_goals: str, linkedin_url: str,
+) -> dict:
     """
-    Main recommendation endpoint — the core of the app.
-
-    Accepts a CV file (PDF/DOCX/TXT) and/or career goals text, then
-    runs the full 4-step pipeline to generate personalised programme
-    recommendations and an outreach email draft.
+    Run Steps 1-3 of the pipeline: parse the inputs, then profile and
+    classify the candidate.
 
     Returns:
-        JSON with: profile, top_categories, recommendations, email_draft
+        {"profile": ..., "top_categories": ...} on success, or an
+        {"error": ..., "recommendations": [], "email_draft": ""} dict to
+        send back as-is if the inputs are unusable.
     """
     # ── Step 1: Parse input sources ─────────────────────────────────
     # Extract raw text from the uploaded file and/or LinkedIn URL.
-    cv_text = ""
-
+    # Parsing (PDF/DOCX decoding, LinkedIn fetch) is blocking work, so it
+    # runs in worker threads to keep the event loop free for other requests.
+    # The file and the LinkedIn page are independent, so both run at once:
+    # the LinkedIn round-trip overlaps the file parsing.
+    # A missing input is stood in for by an already-finished "" result.
+    # The upload's spooled temp file is handed straight to the parser
+    # rather than read into one bytes object first.
     if file:
-        file_bytes = await file.read()
-        cv_text = parse_file(file.filename, file_bytes)
-
+        file_job = asyncio.to_thread(parse_file, file.filename, file.file)
+    else:
+        file_job = asyncio.sleep(0, result="")
     if linkedin_url and linkedin_url.strip():
-        linkedin_text = parse_linkedin_url(linkedin_url.strip())
-        if linkedin_text:
-            cv_text += "\n\n" + linkedin_text
+        linkedin_job = asyncio.to_thread(parse_linkedin_url, linkedin_url.strip())
+    else:
+        linkedin_job = asyncio.sleep(0, result="")
+
+    cv_text, linkedin_text = await asyncio.gather(file_job, linkedin_job)
+    if linkedin_text:
+        cv_text += "\n\n" + linkedin_text
 
     # If a file was uploaded but we couldn't extract text, give a helpful error
     if file and not cv_text:
@@ -144,39 +226,119 @@ async def get_recommendations(
             "email_draft": "",
         }
 
-    # ── Step 2: Extract structured profile ──────────────────────────
-    # Send the CV text to Claude to get a structured JSON profile
-    # (name, role, skills, experience, etc.)
-    combined_text = cv_text
-    if career_goals:
-        combined_text += f"\n\nCareer Goals: {career_goals}"
+    # ── Steps 2 + 3: Profile and classify, concurrently ─────────────
+    # Step 2 sends the CV text to Claude to get a structured JSON profile
+    # (name, role, skills, experience, etc.). Step 3 embeds the career
+    # goals + the start of the CV and compares them against the 12
+    # category centroids. Neither needs the other's output, so both
+    # API round-trips run at the same time instead of back to back.
+    # The goals and the CV are embedded separately and combined with the
+    # goals weighted double, rather than concatenated into one string —
+    # a long CV would otherwise drown out a one-line goal statement.
+    classify_parts = [
+        (career_goals, CLASSIFY_GOALS_WEIGHT),
+        (cv_text[:CLASSIFY_CV_CHARS], 1.0),
+    ]
+
+    profile, categories = await asyncio.gather(
+        aextract_profile(cv_text, career_goals),
+        aclassify_goals(classify_parts, top_k=3),
+    )
+
+    return {"profile": profile, "top_categories": categories}
+
 
-    profile = extract_profile(cv_text, career_goals)
+# ── Main Recommendation Endpoint ────────────────────────────────────
+@app.post("/recommend")
+async def get_recommendations(
+    file: UploadFile = File(None),        # optional CV file upload
+    career_goals: str = Form(""),         # optional free-text career goals
+    linkedin_url: str = Form(""),         # optional LinkedIn profile URL
+):
+    """
+    Main recommendation endpoint — the core of the app.
 
-    # ── Step 3: Classify career interests ───────────────────────────
-    # Build a text string from the candidate's goals + skills + industry,
-    # then embed it and compare against the 12 category centroids.
-    classify_input = career_goals or profile.get("career_goals", "")
-    if profile.get("skills"):
-        classify_input += " " + " ".join(profile["skills"])
-    if profile.get("industry"):
-        classify_input += " " + profile["industry"]
+    Accepts a CV file (PDF/DOCX/TXT) and/or career goals text, then
+    runs the full 4-step pipeline to generate personalised programme
+    recommendations and an outreach email draft.
 
-    categories = classify_goals(classify_input, top_k=3)
+    Returns:
+        JSON with: profile, top_categories, recommendations, email_draft,
+        and _meta (Claude token usage, incl. prompt-cache reads — see
+        recommender._log_usage)
+    """
+    # ── Steps 1-3: Parse, profile, classify ─────────────────────────
+    analysis = await _analyse_candidate(file, career_goals, linkedin_url)
+    if "error" in analysis:
+        return analysis
 
     # ── Step 4: Generate recommendations + email ────────────────────
     # Send the profile + categories + all programmes to Claude,
-    # which picks the top 3 and writes a personalised email.
-    result = recommend(profile, categories)
+    # which picks the top 3 and writes a personalised email. recommend()
+    # is a blocking API call, so it runs in a worker thread.
+    result = await asyncio.to_thread(
+        recommend, analysis["profile"], analysis["top_categories"]
+    )
 
     return {
-        "profile": profile,
-        "top_categories": categories,
+        **analysis,
         "recommendations": result.get("recommendations", []),
         "email_draft": result.get("email_draft", ""),
+        "_meta": result.get("_meta"),
     }
 
 
+# ── Streaming Recommendation Endpoint ───────────────────────────────
+@app.post("/recommend/stream")
+async def stream_recommendations(
+    file: UploadFile = File(None),        # optional CV file upload
+    career_goals: str = Form(""),         # optional free-text career goals
+    linkedin_url: str = Form(""),         # optional LinkedIn profile URL
+):
+    """
+    Same pipeline and inputs as /recommend, streamed as NDJSON.
+
+    Step 4 (Claude writing the recommendations + email) takes several
+    seconds, so instead of waiting for it, this endpoint sends one JSON
+    object per line as soon as each part is ready:
+      {"event": "profile", "profile": ..., "top_categories": ...}
+      {"event": "delta", "text": "..."}   (repeated — Claude's raw output
+                                           as it is written, for progress)
+      {"event": "recommendation", "recommendation": {...}}
+                                           (each programme as soon as Claude
+                                           has finished it, before the email)
+      {"event": "result", "recommendations": [...], "email_draft": "...",
+       "_meta": {...}}
+    Unusable inputs produce a single {"event": "error", ...} line.
+    """
+    # Steps 1-3 run before the response starts, while the upload is
+    # still open; only Step 4 is streamed.
+    analysis = await _analyse_candidate(file, career_goals, linkedin_url)
+
+    async def events():
+        if "error" in analysis:
+            yield orjson.dumps({"event": "error", **analysis}) + b"\n"
+            return
+
+        yield orjson.dumps({"event": "profile", **analysis}) + b"\n"
+        async for kind, payload in astream_recommend(
+            analysis["profile"], analysis["top_categories"]
+        ):
+            if kind == "delta":
+                yield orjson.dumps({"event": "delta", "text": payload}) + b"\n"
+            elif kind == "recommendation":
+                yield orjson.dumps({"event": "recommendation", "recommendation": payload}) + b"\n"
+            else:
+                yield orjson.dumps({
+                    "event": "result",
+                    "recommendations": payload.get("recommendations", []),
+                    "email_draft": payload.get("email_draft", ""),
+                    "_meta": payload.get("_meta"),
+                }) + b"\n"
+
+    return StreamingResponse(events(), media_type="application/x-ndjson")
+
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
@@ -8,10 +8,11 @@ HOW IT WORKS:
   of the system can process.
 
   Supported inputs:
-    - PDF   → uses pypdf to extract text from each page
+    - PDF   → uses pypdfium2 (falling back to pypdf) to extract text from each page
     - DOCX  → uses python-docx to extract text from each paragraph
     - TXT   → decoded directly as UTF-8
-    - LinkedIn URL → uses trafilatura to scrape the public profile page
+    - LinkedIn URL → fetches the public profile page (httpx) and extracts
+                     its text with trafilatura
 
   The extracted text is passed to profiler.py for structured extraction.
 
@@ -20,27 +21,99 @@ FLOW:
 """
 
 import io
+import threading
+from typing import BinaryIO
+
+# ── Lazily imported parsing libraries ───────────────────────────────
+# The parsing libraries are imported on first use rather than at module
+# import, so the server starts (and the other formats keep working) even
+# if one of them is missing or slow to import. After the first call the
+# module/class is kept here, so later calls skip the import statement.
+_pdfium = None
+# PDFium isn't thread-safe and pypdfium2 doesn't serialise calls into it,
+# but main.py parses each upload in its own worker thread. Every pypdfium2
+# call (open, page iteration, text extraction, close) runs under this lock.
+_pdfium_lock = threading.Lock()
+_PdfReader = None
+_Document = None
+_httpx = None
+_trafilatura = None
+
+
+def _as_stream(file_bytes: bytes | BinaryIO) -> BinaryIO:
+    """
+    Return a binary file object positioned at the start of the data.
+
+    Raw bytes are wrapped in a BytesIO stream so the parsing libraries can
+    read them like a file; a file object (e.g. FastAPI's spooled upload)
+    is rewound and used directly, without copying it into memory first.
+    """
+    if isinstance(file_bytes, (bytes, bytearray)):
+        return io.BytesIO(file_bytes)
+    file_bytes.seek(0)
+    return file_bytes
 
 
 # ── PDF Parser ──────────────────────────────────────────────────────
-def parse_pdf(file_bytes: bytes) -> str:
+def parse_pdf(file_bytes: bytes | BinaryIO) -> str:
     """
     Extract text from a PDF file.
 
-    Uses pypdf (pure Python, no system dependencies) to read each page
-    and concatenate the extracted text. Works well for text-based PDFs;
-    scanned PDFs with only images will return empty text.
+    Uses pypdfium2 (Python bindings for Google's PDFium, the PDF engine in
+    Chrome) to read each page and concatenate the extracted text. The
+    parsing and text extraction run in native code, which is several
+    times faster than a pure-Python parser on multi-page CVs. If PDFium
+    can't open the file, falls back to pypdf (pure Python), which is more
+    forgiving of some malformed PDFs. PDFium calls are serialised by
+    _pdfium_lock, since uploads are parsed on concurrent worker threads.
+    Works well for text-based PDFs; scanned PDFs with only images will
+    return empty text.
 
     Args:
-        file_bytes : raw bytes of the uploaded PDF file.
+        file_bytes : raw bytes of the uploaded PDF file, or a binary
+                     file object to read them from.
 
     Returns:
         All text from the PDF, pages joined by newlines.
     """
-    from pypdf import PdfReader
+    global _pdfium
+    if _pdfium is None:
+        import pypdfium2 as _pdfium
+
+    if not isinstance(file_bytes, (bytes, bytearray)):
+        file_bytes = _as_stream(file_bytes)
+
+    text_parts = []
+    with _pdfium_lock:
+        try:
+            pdf = _pdfium.PdfDocument(file_bytes)
+        except _pdfium.PdfiumError:
+            pdf = None
+        if pdf is not None:
+            try:
+                for page in pdf:
+                    textpage = page.get_textpage()
+                    text = textpage.get_text_range()
+                    textpage.close()
+                    page.close()
+                    if text:
+                        text_parts.append(text)
+            finally:
+                pdf.close()
+
+    # pypdf is pure Python, so the fallback runs outside the lock
+    if pdf is None:
+        return _parse_pdf_pypdf(file_bytes)
+    return "\n".join(text_parts)
+
+
+def _parse_pdf_pypdf(file_bytes: bytes | BinaryIO) -> str:
+    """Fallback PDF text extraction with pypdf (see parse_pdf)."""
+    global _PdfReader
+    if _PdfReader is None:
+        from pypdf import PdfReader as _PdfReader
 
-    # Wrap bytes in a BytesIO stream so PdfReader can read it like a file
-    reader = PdfReader(io.BytesIO(file_bytes))
+    reader = _PdfReader(_as_stream(file_bytes))
     text_parts = []
     for page in reader.pages:
         text = page.extract_text()
@@ -50,7 +123,7 @@ def parse_pdf(file_bytes: bytes) -> str:
 
 
 # ── DOCX Parser ─────────────────────────────────────────────────────
-def parse_docx(file_bytes: bytes) -> str:
+def parse_docx(file_bytes: bytes | BinaryIO) -> str:
     """
     Extract text from a DOCX (Microsoft Word) file.
 
@@ -58,15 +131,17 @@ def parse_docx(file_bytes: bytes) -> str:
     Skips empty paragraphs to keep the output clean.
 
     Args:
-        file_bytes : raw bytes of the uploaded DOCX file.
+        file_bytes : raw bytes of the uploaded DOCX file, or a binary
+                     file object to read them from.
 
     Returns:
         All paragraph text, joined by newlines.
     """
-    from docx import Document
+    global _Document
+    if _Document is None:
+        from docx import Document as _Document
 
-    # Wrap bytes in a BytesIO stream so Document can read it like a file
-    doc = Document(io.BytesIO(file_bytes))
+    doc = _Document(_as_stream(file_bytes))
     text_parts = []
     for para in doc.paragraphs:
         if para.text.strip():          # skip blank paragraphs
@@ -75,7 +150,7 @@ def parse_docx(file_bytes: bytes) -> str:
 
 
 # ── Plain Text Parser ──────────────────────────────────────────────
-def parse_txt(file_bytes: bytes) -> str:
+def parse_txt(file_bytes: bytes | BinaryIO) -> str:
     """
     Extract text from a plain text file.
 
@@ -83,21 +158,47 @@ def parse_txt(file_bytes: bytes) -> str:
     any non-UTF-8 bytes rather than crashing.
 
     Args:
-        file_bytes : raw bytes of the uploaded text file.
+        file_bytes : raw bytes of the uploaded text file, or a binary
+                     file object to read them from.
 
     Returns:
         The decoded string.
     """
+    if not isinstance(file_bytes, (bytes, bytearray)):
+        file_bytes = _as_stream(file_bytes).read()
     return file_bytes.decode("utf-8", errors="ignore")
 
 
 # ── LinkedIn URL Scraper ────────────────────────────────────────────
+# One shared HTTP client for profile fetches — created on first use, then
+# reused so repeat fetches ride the same keep-alive (HTTP/2) connection
+# instead of a fresh TCP + TLS handshake each time. Safe to share across
+# the worker threads parse_linkedin_url() runs in.
+_HTTP_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (compatible; VlerickProgrammeRecommender/1.0)",
+    "Accept-Language": "en",
+}
+_http_client = None
+
+
+def _get_http_client():
+    """Return the shared httpx client, creating it on first use."""
+    global _http_client, _httpx
+    if _http_client is None:
+        import httpx as _httpx
+        _http_client = _httpx.Client(
+            http2=True, timeout=10.0, follow_redirects=True, headers=_HTTP_HEADERS,
+        )
+    return _http_client
+
+
 def parse_linkedin_url(url: str) -> str:
     """
     Scrape text from a public LinkedIn profile URL.
 
-    Uses trafilatura, a web scraping library that extracts the main
-    content from a page while stripping navigation, ads, etc.
+    Fetches the page with the shared httpx client and uses trafilatura,
+    a web scraping library that extracts the main content from a page
+    while stripping navigation, ads, etc.
 
     NOTE: Only works for PUBLIC profiles. LinkedIn aggressively blocks
     scraping, so this may return empty for private profiles or if
@@ -109,22 +210,40 @@ def parse_linkedin_url(url: str) -> str:
     Returns:
         Extracted text from the profile page, or empty string on failure.
     """
-    import trafilatura
+    global _trafilatura
+    if _trafilatura is None:
+        import trafilatura as _trafilatura
+
+    http_client = _get_http_client()
+    try:
+        response = http_client.get(url)
+    except (_httpx.HTTPError, _httpx.InvalidURL):
+        return ""
+    if response.status_code != 200:
+        return ""
 
-    downloaded = trafilatura.fetch_url(url)
-    if downloaded:
-        text = trafilatura.extract(downloaded)
-        return text or ""
-    return ""
+    text = _trafilatura.extract(response.text)
+    return text or ""
 
 
 # ── Main Router ─────────────────────────────────────────────────────
-def parse_file(filename: str, file_bytes: bytes) -> str:
+# File extension → parser. Supporting a new format is one entry here.
+_PARSERS = {
+    "pdf": parse_pdf,
+    "docx": parse_docx,
+    "doc": parse_docx,
+    "txt": parse_txt,
+    "text": parse_txt,
+    "csv": parse_txt,
+}
+
+
+def parse_file(filename: str, file_bytes: bytes | BinaryIO) -> str:
     """
     Route an uploaded file to the correct parser based on file extension.
 
-    This is the main entry point called by main.py. It looks at the
-    filename extension and calls the appropriate parser function.
+    This is the main entry point called by main.py. It looks up the
+    filename extension in _PARSERS and calls the matching parser function.
 
     Supported extensions:
       .pdf          → parse_pdf()
@@ -134,7 +253,10 @@ def parse_file(filename: str, file_bytes: bytes) -> str:
 
     Args:
         filename   : original filename (e.g. "resume.pdf")
-        file_bytes : raw bytes of the uploaded file
+        file_bytes : raw bytes of the uploaded file, or a binary file
+                     object to read them from (main.py passes the upload's
+                     spooled temp file, so it's never read into one big
+                     bytes object)
 
     Returns:
         Extracted text as a string.
@@ -142,12 +264,5 @@ def parse_file(filename: str, file_bytes: bytes) -> str:
     # Extract the file extension (everything after the last dot)
     ext = filename.lower().rsplit(".", 1)[-1] if "." in filename else ""
 
-    if ext == "pdf":
-        return parse_pdf(file_bytes)
-    elif ext in ("docx", "doc"):
-        return parse_docx(file_bytes)
-    elif ext in ("txt", "text", "csv"):
-        return parse_txt(file_bytes)
-    else:
-        # Unknown extension — try parsing as plain text as a last resort
-        return parse_txt(file_bytes)
+    # Unknown extension — try parsing as plain text as a last resort
+    return _PARSERS.get(ext, parse_txt)(file_bytes)
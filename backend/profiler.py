@@ -5,55 +5,528 @@ Uses Anthropic Claude to extract structured candidate information.
 HOW IT WORKS:
   1. Takes raw CV text (extracted by parsers.py) + optional career goals.
   2. Sends them to Anthropic's Claude Sonnet 4 with an HR-analyst prompt.
-  3. Claude reads the CV and returns a clean JSON object with standardised
-     fields: name, role, experience, industry, skills, education, etc.
-  4. If Claude returns malformed JSON, we fall back to a safe empty profile.
+  3. Claude reads the CV and returns the profile as a record_profile tool
+     call — a schema-checked object with standardised fields: name, role,
+     experience, industry, skills, education, etc.
+  4. If no usable tool call comes back, we fall back to a safe empty profile.
+  5. Valid profiles are cached (memory + disk), so re-submitting the same
+     CV and goals skips the Claude call.
+     (astream_profile() does the same but yields the profile's fields
+     as Claude fills them in.)
 
 WHY CLAUDE SONNET 4?
   - Excellent at structured extraction from messy/unstructured text.
   - max_tokens=500 keeps it fast and cheap (profile JSON is small).
-  - The system prompt forces strict JSON output with no extra commentary.
+  - Forced tool use guarantees structured output with no extra commentary.
 
-This module is called by main.py (Step 2) right after the CV is parsed.
+This module is called by main.py (Step 2) right after the CV is parsed
+(via aextract_profile, the async twin of extract_profile).
 The structured profile it returns feeds into both the classifier and
 the recommender.
 """
 
-import json
+import asyncio
+import copy
+import hashlib
 import os
-import anthropic
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import TYPE_CHECKING
+import orjson
+from pydantic import BaseModel, ValidationError, field_validator
+
+if TYPE_CHECKING:
+    import anthropic
 
 # ── System prompt for Claude ────────────────────────────────────────
-# This prompt tells the model to act as an HR analyst and extract
-# exactly the fields we need in a strict JSON format.
-# "Return ONLY valid JSON" prevents the model from adding explanations.
-SYSTEM_PROMPT = """You are an expert HR analyst. Given a candidate's CV/resume text and their stated career goals, extract a structured profile.
-
-Return ONLY valid JSON with these fields:
-{
-  "name": "candidate name",
-  "current_role": "current job title",
-  "years_experience": 0,
-  "industry": "primary industry",
-  "skills": ["skill1", "skill2", "skill3"],
-  "education": "highest education level and field",
-  "career_goals": "summarized career aspirations",
-  "seniority": "junior|mid|senior|executive"
-}
+# This prompt tells the model to act as an HR analyst and what each
+# field of the profile should contain. The exact output structure is
+# enforced by the record_profile tool below rather than by the prompt.
+SYSTEM_PROMPT = """You are an expert HR analyst. Given a candidate's CV/resume text and their stated career goals, extract a structured profile and record it with the record_profile tool.
 
 If a field cannot be determined, use null. For skills, list the top 5-8 most relevant professional skills."""
 
+# ── Profile schema ──────────────────────────────────────────────────
+# What a profile looks like once it leaves this module. Claude's output is
+# validated against it, so the rest of the pipeline always gets every
+# field with the right type; the defaults double as the fallback profile.
+SENIORITY_LEVELS = ("junior", "mid", "senior", "executive")
+
+
+class Profile(BaseModel):
+    name: str | None = None
+    current_role: str | None = None
+    years_experience: int | float | None = None
+    industry: str | None = None
+    skills: list[str] = []
+    education: str | None = None
+    career_goals: str | None = None
+    seniority: str | None = None
+
+    @field_validator("skills", mode="before")
+    @classmethod
+    def _null_skills(cls, value):
+        # Claude uses null for "can't tell" — that's an empty list here
+        return [] if value is None else value
+
+    @field_validator("seniority")
+    @classmethod
+    def _known_seniority(cls, value):
+        # Normalise case, and treat anything outside the four levels as unknown
+        if value is None:
+            return None
+        value = value.strip().lower()
+        return value if value in SENIORITY_LEVELS else None
+
+# ── Profile tool ────────────────────────────────────────────────────
+# Claude is forced (tool_choice) to "call" this tool, so the profile comes
+# back as the tool call's already-parsed `input` dict, validated against
+# this schema — no JSON-in-text to strip fences from or fail to parse.
+PROFILE_TOOL = {
+    "name": "record_profile",
+    "description": "Record the structured profile extracted from the candidate's CV.",
+    "input_schema": {
+        "type": "object",
+        "properties": {
+            "name": {"type": ["string", "null"], "description": "candidate name"},
+            "current_role": {"type": ["string", "null"], "description": "current job title"},
+            "years_experience": {"type": ["number", "null"], "description": "total years of professional experience"},
+            "industry": {"type": ["string", "null"], "description": "primary industry"},
+            "skills": {"type": "array", "items": {"type": "string"}, "description": "top 5-8 most relevant professional skills"},
+            "education": {"type": ["string", "null"], "description": "highest education level and field"},
+            "career_goals": {"type": ["string", "null"], "description": "summarized career aspirations"},
+            "seniority": {"type": ["string", "null"], "enum": [*SENIORITY_LEVELS, None]},
+        },
+        "required": [
+            "name", "current_role", "years_experience", "industry",
+            "skills", "education", "career_goals", "seniority",
+        ],
+    },
+}
+
+# Claude model used for extraction (part of the cache key below, so
+# switching models never serves profiles extracted by the old one).
+MODEL = "claude-sonnet-4-20250514"
+
+# The system prompt as sent, marked for Anthropic prompt caching. The
+# tool schema + system prompt are the same on every call, so the API can
+# reuse the processed prefix (5-minute cache) instead of re-reading it.
+# Claude only caches prefixes of at least 1024 tokens; below that the
+# marker is simply ignored, so it costs nothing while the prompt is short.
+SYSTEM_BLOCKS = [
+    {"type": "text", "text": SYSTEM_PROMPT, "cache_control": {"type": "ephemeral"}},
+]
+
+# ── Profile cache ───────────────────────────────────────────────────
+# Users often re-submit the same CV (tweaking their goals, retrying), and
+# the Claude call is by far the slowest and most expensive step. Extracted
+# profiles are cached by a hash of exactly what Claude would see (the
+# truncated CV + career goals): the last PROFILE_CACHE_SIZE in memory, and
+# every one as a small JSON file under PROFILE_CACHE_DIR so they survive a
+# restart. Only successfully parsed replies are cached here — a fallback
+# profile is only remembered briefly (below). Entries expire after
+# PROFILE_CACHE_TTL seconds (30 days), so CV data isn't kept around
+# indefinitely.
+PROFILE_CACHE_SIZE = 512
+PROFILE_CACHE_TTL = 30 * 24 * 3600
+PROFILE_CACHE_DIR = os.path.join(os.path.dirname(__file__), ".cache", "profiles")
+_profile_cache: OrderedDict[str, tuple[float, dict]] = OrderedDict()  # key → (stored_at, profile)
+_profile_cache_lock = threading.Lock()
+
+# Negative cache: inputs whose last extraction failed (no usable tool call
+# from Claude) get the fallback profile straight back for
+# FAILED_CACHE_TTL seconds, rather than a fresh Claude call that is
+# likely to fail the same way. Memory only, and short-lived, so a
+# transient hiccup is retried after an hour (or a restart). Shares
+# _profile_cache_lock.
+FAILED_CACHE_SIZE = 1024
+FAILED_CACHE_TTL = 3600
+_failed_profiles: OrderedDict[str, tuple[float, dict]] = OrderedDict()  # key → (failed_at, fallback)
+
+# Shared Anthropic clients — created on first use and reused for every
+# call, so requests share one keep-alive (HTTP/2) connection pool to
+# api.anthropic.com instead of building a new client (and TLS
+# connection) each time. The sync client serves extract_profile(); the
+# async one serves aextract_profile(). Both are safe to share across
+# threads / tasks.
+# Bounded timeout and retries (the SDK default timeout is 10 minutes), so a
+# hung connection fails the request instead of tying up a worker. Read
+# timeout: the profile reply is short (max_tokens=500).
+# Built with the SDK's own anthropic.Timeout, not httpx's — recent SDK
+# releases run on their own httpx fork and reject httpx objects.
+_HTTP_TIMEOUT = 30.0          # seconds
+_HTTP_CONNECT_TIMEOUT = 5.0
+_MAX_RETRIES = 3
+_client: "anthropic.Anthropic | None" = None
+_async_client: "anthropic.AsyncAnthropic | None" = None
+
+# The anthropic SDK is imported on first use (by the client getters below)
+# rather than at module import: it takes about a second to import, which
+# every script, reload or cold start that merely imports this module would
+# otherwise pay even if it never calls Claude (e.g. cache-only lookups).
+_anthropic = None
+
+
+def _import_anthropic():
+    """Return the anthropic module, importing it on first use."""
+    global _anthropic
+    if _anthropic is None:
+        import anthropic as _anthropic
+    return _anthropic
+
+
+def _get_client() -> "anthropic.Anthropic":
+    """Return the shared Anthropic client (uses the CLAUDE_API env var)."""
+    global _client
+    if _client is None:
+        anthropic = _import_anthropic()
+        _client = anthropic.Anthropic(
+            api_key=os.environ.get("CLAUDE_API"),
+            timeout=anthropic.Timeout(_HTTP_TIMEOUT, connect=_HTTP_CONNECT_TIMEOUT),
+            max_retries=_MAX_RETRIES,
+            http_client=anthropic.DefaultHttpxClient(http2=True),
+        )
+    return _client
+
+
+def _new_async_client() -> "anthropic.AsyncAnthropic":
+    """Create an AsyncAnthropic client (uses the CLAUDE_API env var)."""
+    anthropic = _import_anthropic()
+    return anthropic.AsyncAnthropic(
+        api_key=os.environ.get("CLAUDE_API"),
+        timeout=anthropic.Timeout(_HTTP_TIMEOUT, connect=_HTTP_CONNECT_TIMEOUT),
+        max_retries=_MAX_RETRIES,
+        http_client=anthropic.DefaultAsyncHttpxClient(http2=True),
+    )
+
+
+def _get_async_client() -> "anthropic.AsyncAnthropic":
+    """
+    Return the shared AsyncAnthropic client for the calling event loop.
+
+    An async client's pooled connections belong to the loop they were
+    opened on, so code running on the background loop (see _run) gets a
+    client of its own; everything else — main.py's server loop — shares
+    _async_client.
+    """
+    global _async_client, _loop_client
+    try:
+        running = asyncio.get_running_loop()
+    except RuntimeError:
+        running = None
+    if running is not None and running is _loop:
+        if _loop_client is None:
+            _loop_client = _new_async_client()
+        return _loop_client
+    if _async_client is None:
+        _async_client = _new_async_client()
+    return _async_client
+
+
+# ── Background event loop ───────────────────────────────────────────
+# Sync entry points that fan out to the async code (extract_profiles) run
+# it on one persistent event loop in a daemon thread, started on first
+# use, instead of an asyncio.run() per call. The loop — and its client's
+# keep-alive HTTP/2 connections — outlive each call, so back-to-back
+# batches reuse them, and the sync entry points also work when called
+# from a thread that already has a running loop.
+_loop: asyncio.AbstractEventLoop | None = None
+_loop_client: "anthropic.AsyncAnthropic | None" = None
+_loop_lock = threading.Lock()
+
+
+def _get_loop() -> asyncio.AbstractEventLoop:
+    """Return the background event loop, starting its thread on first use."""
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            threading.Thread(
+                target=_loop.run_forever, name="profiler-loop", daemon=True,
+            ).start()
+    return _loop
+
+
+def _run(coro):
+    """Run a coroutine on the background loop and wait for its result."""
+    return asyncio.run_coroutine_threadsafe(coro, _get_loop()).result()
+
+
+# ── Rate limiting ───────────────────────────────────────────────────
+# Claude calls are paced client-side against the account's rate limits, so
+# a bulk job (e.g. 100 CVs through aextract_profiles) waits its turn here
+# instead of firing requests until the API answers 429 and the SDK backs
+# off. Two token buckets, each refilling continuously over a minute: one
+# for requests, one for tokens (the prompt, estimated at ~4 characters per
+# token, plus the reply's max_tokens). The defaults are the API's tier-2
+# limits for Sonnet; set CLAUDE_MAX_RPM / CLAUDE_MAX_TPM to match the
+# account. Cache hits never touch the buckets.
+CLAUDE_MAX_RPM = int(os.environ.get("CLAUDE_MAX_RPM", "1000"))
+CLAUDE_MAX_TPM = int(os.environ.get("CLAUDE_MAX_TPM", "450000"))
+
+
+class _TokenBucket:
+    """A thread-safe token bucket refilled at `per_minute` tokens per minute."""
+
+    def __init__(self, per_minute: int):
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.level = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def reserve(self, amount: float) -> float:
+        """
+        Take `amount` tokens and return how many seconds the caller must
+        wait before using them (0 if the bucket had enough). The bucket may
+        go negative, so callers queue up in the order they reserved.
+        """
+        with self.lock:
+            now = time.monotonic()
+            self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+            self.updated = now
+            self.level -= amount
+            return max(0.0, -self.level / self.rate)
+
+
+_RPM = _TokenBucket(CLAUDE_MAX_RPM)
+_TPM = _TokenBucket(CLAUDE_MAX_TPM)
+
+
+def _throttle_delay(system: str, user_message: str, max_tokens: int) -> float:
+    """Reserve one request and its estimated tokens; return the wait in seconds."""
+    tokens = (len(system) + len(user_message)) // 4 + max_tokens
+    return max(_RPM.reserve(1), _TPM.reserve(tokens))
+
+
+def _throttle(system: str, user_message: str, max_tokens: int) -> None:
+    """Block until a Claude call fits within the rate limits."""
+    delay = _throttle_delay(system, user_message, max_tokens)
+    if delay:
+        time.sleep(delay)
+
+
+async def _athrottle(system: str, user_message: str, max_tokens: int) -> None:
+    """Async version of _throttle() — waits without blocking the event loop."""
+    delay = _throttle_delay(system, user_message, max_tokens)
+    if delay:
+        await asyncio.sleep(delay)
+
+
+# ── CV truncation ───────────────────────────────────────────────────
+# The CV sent to Claude is capped by (approximate) tokens rather than
+# characters. Text extracted from PDFs is full of runs of spaces and
+# blank lines, which count towards a character cap but carry nothing,
+# so whitespace is collapsed first; the CV is then cut after
+# CV_MAX_WORDS words/punctuation marks (roughly 1.3 tokens each in
+# English, i.e. ~1500 tokens), always on a word boundary.
+CV_MAX_WORDS = 1200
+_SPACES_RE = re.compile(r"[^\S\n]+")
+_BLANK_LINES_RE = re.compile(r"\n\s*\n\s*")
+_WORD_RE = re.compile(r"\w+|[^\w\s]")
+
+
+def _truncate_cv(cv_text: str, max_words: int = CV_MAX_WORDS) -> str:
+    """Collapse whitespace and cut the CV after `max_words` words."""
+    text = _BLANK_LINES_RE.sub("\n\n", _SPACES_RE.sub(" ", cv_text)).strip()
+    for i, match in enumerate(_WORD_RE.finditer(text), 1):
+        if i == max_words:
+            return text[:match.end()]
+    return text
+
+
+# CVs shorter than this (after stripping) carry too little to extract a
+# profile from — an empty upload, a LinkedIn page that came back blank,
+# "No CV provided" — so they skip Claude and get the fallback profile
+# (career goals filled in) straight away, instead of paying for a call.
+MIN_CV_CHARS = 200
+
+
+def _too_short(cv_text: str) -> bool:
+    """True if the CV is too short to be worth sending to Claude."""
+    return len(cv_text.strip()) < MIN_CV_CHARS
+
+
+def warm_up() -> None:
+    """Create the shared Anthropic clients ahead of the first request."""
+    _get_client()
+    _get_async_client()
+
+
+def _build_user_message(cv_text: str, career_goals: str) -> str:
+    """
+    Build the user message sent to Claude.
+
+    Truncates the CV to about 1500 tokens (keeps API cost low while
+    capturing enough — see _truncate_cv) and appends the career goals
+    if provided.
+    """
+    user_message = f"CV/Resume:\n{_truncate_cv(cv_text)}"
+    if career_goals:
+        user_message += f"\n\nStated career goals:\n{career_goals}"
+    return user_message
+
+
+def _cache_key(user_message: str) -> str:
+    """BLAKE2b hash of the model + the exact message sent to Claude."""
+    return hashlib.blake2b(
+        f"{MODEL}|{user_message}".encode("utf-8"), digest_size=16
+    ).hexdigest()
+
+
+def _cached_profile(key: str) -> dict | None:
+    """
+    Look a profile up in the memory cache, then on disk.
+
+    Returns a copy, so callers can modify it without touching the cache,
+    or None if there is no entry younger than PROFILE_CACHE_TTL. An input
+    that recently failed returns its fallback profile (see
+    _failed_profiles).
+    """
+    expired_before = time.time() - PROFILE_CACHE_TTL
+    with _profile_cache_lock:
+        entry = _profile_cache.get(key)
+        if entry is not None:
+            stored_at, profile = entry
+            if stored_at >= expired_before:
+                _profile_cache.move_to_end(key)
+                return copy.deepcopy(profile)
+            del _profile_cache[key]
+
+        entry = _failed_profiles.get(key)
+        if entry is not None:
+            failed_at, fallback = entry
+            if failed_at >= time.time() - FAILED_CACHE_TTL:
+                return copy.deepcopy(fallback)
+            del _failed_profiles[key]
+
+    path = os.path.join(PROFILE_CACHE_DIR, f"{key}.json")
+    try:
+        stored_at = os.path.getmtime(path)
+        if stored_at < expired_before:
+            os.remove(path)
+            return None
+        with open(path, "rb") as f:
+            profile = orjson.loads(f.read())
+    except (OSError, ValueError):
+        return None
+
+    _remember_profile(key, profile, stored_at)
+    return copy.deepcopy(profile)
+
+
+def _remember_profile(key: str, profile: dict, stored_at: float) -> None:
+    """Add a profile to the memory cache, evicting the least recently used."""
+    with _profile_cache_lock:
+        _profile_cache[key] = (stored_at, profile)
+        _profile_cache.move_to_end(key)
+        if len(_profile_cache) > PROFILE_CACHE_SIZE:
+            _profile_cache.popitem(last=False)
+
+
+def _remember_failure(key: str, fallback: dict) -> None:
+    """Record that extraction failed for this input (see _failed_profiles)."""
+    with _profile_cache_lock:
+        _failed_profiles[key] = (time.time(), copy.deepcopy(fallback))
+        _failed_profiles.move_to_end(key)
+        if len(_failed_profiles) > FAILED_CACHE_SIZE:
+            _failed_profiles.popitem(last=False)
+
+
+def _store_profile(key: str, profile: dict) -> None:
+    """Cache a profile in memory and on disk (disk errors are ignored)."""
+    _remember_profile(key, copy.deepcopy(profile), time.time())
+    path = os.path.join(PROFILE_CACHE_DIR, f"{key}.json")
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        os.makedirs(PROFILE_CACHE_DIR, exist_ok=True)
+        with open(tmp_path, "wb") as f:
+            f.write(orjson.dumps(profile))
+        os.replace(tmp_path, path)  # atomic — readers never see a half-written file
+    except OSError:
+        pass
+
+
+def _parse_profile(response, career_goals: str) -> dict | None:
+    """
+    Pull the profile out of Claude's record_profile tool call.
+
+    Args:
+        response     : the Anthropic Messages API response
+        career_goals : the user's stated goals (used to fill career_goals)
+
+    Returns:
+        Profile dict with the fields described in PROFILE_TOOL, or None
+        if the response contains no usable tool call (e.g. it was cut
+        off by max_tokens).
+    """
+    return _complete_profile(_tool_input(response, PROFILE_TOOL["name"]), career_goals)
+
+
+def _tool_input(response, tool_name: str):
+    """Return the input of the first call to `tool_name` in a response, or None."""
+    return next(
+        (block.input for block in response.content
+         if block.type == "tool_use" and block.name == tool_name),
+        None,
+    )
+
+
+def _complete_profile(profile, career_goals: str) -> dict | None:
+    """
+    Validate a profile returned by Claude and fill in the career goals.
+
+    Returns:
+        The profile as a plain dict with every Profile field present
+        (missing ones defaulted), or None if it doesn't fit the schema.
+    """
+    try:
+        profile = Profile.model_validate(profile)
+    except ValidationError:
+        return None
+
+    # Make sure career_goals is always populated (Claude might have
+    # returned null for it, but the user explicitly provided goals).
+    if not profile.career_goals and career_goals:
+        profile.career_goals = career_goals
+
+    return profile.model_dump()
+
+
+def _fallback_profile(career_goals: str) -> dict:
+    """
+    Minimal profile used when Claude didn't return a usable profile, so
+    the rest of the pipeline can still run.
+    """
+    return Profile(career_goals=career_goals).model_dump()
+
+
+def _profile_from_reply(key: str, response, career_goals: str) -> dict:
+    """Parse Claude's reply, caching it if valid, else fall back."""
+    profile = _parse_profile(response, career_goals)
+    if profile is None:
+        profile = _fallback_profile(career_goals)
+        _remember_failure(key, profile)
+        return profile
+    _store_profile(key, profile)
+    return profile
+
 
 def extract_profile(cv_text: str, career_goals: str = "") -> dict:
     """
     Extract a structured candidate profile from raw CV text using Claude Sonnet 4.
 
     Pipeline:
-      1. Truncate CV text to 6000 chars (keeps API cost low, captures enough).
+      1. Truncate CV text to ~1500 tokens (keeps API cost low, captures enough).
       2. Append career goals if provided.
-      3. Send to Claude with the HR-analyst system prompt.
-      4. Parse the JSON response.
-      5. If parsing fails, return a safe fallback dict with null fields.
+      3. Return the cached profile if this exact input was seen before
+         (or the fallback profile if the CV is too short to bother —
+         see MIN_CV_CHARS).
+      4. Otherwise send to Claude with the HR-analyst system prompt.
+      5. Read the profile from the tool call (and cache it).
+      6. If there is no usable tool call, return a safe fallback dict with null fields.
 
     Args:
         cv_text      : raw text extracted from the uploaded CV/resume file.
@@ -63,58 +536,234 @@ def extract_profile(cv_text: str, career_goals: str = "") -> dict:
         Dict with keys: name, current_role, years_experience, industry,
         skills (list), education, career_goals, seniority.
     """
-    # Create an Anthropic client using the CLAUDE_API env var
-    client = anthropic.Anthropic(api_key=os.environ.get("CLAUDE_API"))
+    if _too_short(cv_text):
+        return _fallback_profile(career_goals)
 
-    # Build the user message — truncate CV to first 6000 characters
-    # to avoid hitting token limits and keep costs low.
-    user_message = f"CV/Resume:\n{cv_text[:6000]}"
-    if career_goals:
-        user_message += f"\n\nStated career goals:\n{career_goals}"
+    user_message = _build_user_message(cv_text, career_goals)
+    key = _cache_key(user_message)
+    profile = _cached_profile(key)
+    if profile is not None:
+        return profile
 
     # Call Claude Sonnet 4 for structured extraction
     # max_tokens=500 is plenty for the small JSON profile output
-    response = client.messages.create(
-        model="claude-sonnet-4-20250514",
+    _throttle(SYSTEM_PROMPT, user_message, 500)
+    response = _get_client().messages.create(
+        model=MODEL,
         max_tokens=500,
-        system=SYSTEM_PROMPT,
+        system=SYSTEM_BLOCKS,
+        tools=[PROFILE_TOOL],
+        tool_choice={"type": "tool", "name": PROFILE_TOOL["name"]},
         messages=[
             {"role": "user", "content": user_message},
         ],
     )
 
-    content = response.content[0].text.strip()
+    return _profile_from_reply(key, response, career_goals)
 
-    # ── Parse JSON from the response ────────────────────────────────
-    # Claude sometimes wraps its JSON in markdown code fences like:
-    #   ```json
-    #   { ... }
-    #   ```
-    # We strip those before attempting to parse.
-    if content.startswith("```"):
-        content = content.split("```")[1]
-        if content.startswith("json"):
-            content = content[4:]
 
-    try:
-        profile = json.loads(content)
-    except json.JSONDecodeError:
-        # FALLBACK: if Claude didn't return valid JSON, create a
-        # minimal profile so the rest of the pipeline can still run.
-        profile = {
-            "name": None,
-            "current_role": None,
-            "years_experience": None,
-            "industry": None,
-            "skills": [],
-            "education": None,
-            "career_goals": career_goals,
-            "seniority": None,
-        }
+async def aextract_profile(cv_text: str, career_goals: str = "") -> dict:
+    """
+    Async version of extract_profile() — same prompt, same output, same cache.
 
-    # Make sure career_goals is always populated (Claude might have
-    # returned null for it, but the user explicitly provided goals).
-    if not profile.get("career_goals") and career_goals:
-        profile["career_goals"] = career_goals
+    Uses the AsyncAnthropic client so the FastAPI event loop stays free
+    while Claude is working, and lets main.py run profile extraction
+    concurrently with classification.
+    """
+    if _too_short(cv_text):
+        return _fallback_profile(career_goals)
 
-    return profile
+    user_message = _build_user_message(cv_text, career_goals)
+    key = _cache_key(user_message)
+    profile = await asyncio.to_thread(_cached_profile, key)
+    if profile is not None:
+        return profile
+
+    await _athrottle(SYSTEM_PROMPT, user_message, 500)
+    response = await _get_async_client().messages.create(
+        model=MODEL,
+        max_tokens=500,
+        system=SYSTEM_BLOCKS,
+        tools=[PROFILE_TOOL],
+        tool_choice={"type": "tool", "name": PROFILE_TOOL["name"]},
+        messages=[
+            {"role": "user", "content": user_message},
+        ],
+    )
+
+    return await asyncio.to_thread(_profile_from_reply, key, response, career_goals)
+
+
+async def astream_profile(cv_text: str, career_goals: str = ""):
+    """
+    Streaming version of aextract_profile() — same prompt, same result,
+    same cache.
+
+    Yields ("partial", dict) each time more of Claude's record_profile
+    call has arrived (the fields filled in so far — e.g. name and role
+    before skills — parsed from the incomplete JSON), then a final
+    ("profile", dict) exactly as aextract_profile() would return it.
+    The stream is closed as soon as the tool call is complete, without
+    waiting for the rest of the message. A cached profile is yielded
+    straight away as the final result, with no partials.
+    """
+    if _too_short(cv_text):
+        yield "profile", _fallback_profile(career_goals)
+        return
+
+    user_message = _build_user_message(cv_text, career_goals)
+    key = _cache_key(user_message)
+    profile = await asyncio.to_thread(_cached_profile, key)
+    if profile is not None:
+        yield "profile", profile
+        return
+
+    await _athrottle(SYSTEM_PROMPT, user_message, 500)
+    async with _get_async_client().messages.stream(
+        model=MODEL,
+        max_tokens=500,
+        system=SYSTEM_BLOCKS,
+        tools=[PROFILE_TOOL],
+        tool_choice={"type": "tool", "name": PROFILE_TOOL["name"]},
+        messages=[
+            {"role": "user", "content": user_message},
+        ],
+    ) as stream:
+        async for event in stream:
+            # The SDK parses the partial tool-call JSON as it streams in;
+            # "snapshot" is the object so far (trailing strings included).
+            if event.type == "input_json" and isinstance(event.snapshot, dict):
+                yield "partial", dict(event.snapshot)
+            elif event.type == "content_block_stop" and event.content_block.type == "tool_use":
+                break
+        response = stream.current_message_snapshot
+
+    yield "profile", await asyncio.to_thread(_profile_from_reply, key, response, career_goals)
+
+
+# ── Batch extraction ────────────────────────────────────────────────
+# For processing many CVs at once (e.g. a bulk import), where running
+# extract_profile() in a loop would wait for each Claude call in turn.
+BATCH_CONCURRENCY = 20
+
+
+async def aextract_profiles(
+    items: list[tuple[str, str]], concurrency: int = BATCH_CONCURRENCY,
+) -> list[dict]:
+    """
+    Extract profiles for many CVs concurrently.
+
+    At most `concurrency` Claude calls are in flight at any time, and
+    each one waits for the rate limiter (see _TokenBucket), so a large
+    batch doesn't trip the API's rate limits. Cached CVs return from the
+    cache without an API call.
+
+    Args:
+        items       : list of (cv_text, career_goals) pairs
+        concurrency : maximum number of simultaneous Claude calls
+
+    Returns:
+        One profile dict per item, in the same order.
+    """
+    sem = asyncio.Semaphore(concurrency)
+
+    async def one(cv_text: str, career_goals: str) -> dict:
+        async with sem:
+            return await aextract_profile(cv_text, career_goals)
+
+    return await asyncio.gather(*(one(cv, goals) for cv, goals in items))
+
+
+def extract_profiles(
+    items: list[tuple[str, str]], concurrency: int = BATCH_CONCURRENCY,
+) -> list[dict]:
+    """
+    Synchronous entry point for aextract_profiles() — same arguments and
+    output. Runs on the background event loop (see _run); from async
+    code, await aextract_profiles() instead.
+    """
+    return _run(aextract_profiles(items, concurrency))
+
+
+# ── Multi-CV extraction ─────────────────────────────────────────────
+# Packs several CVs into ONE Claude request that returns a profile per
+# CV, so the system prompt and tool schema are paid for once per batch
+# rather than once per CV, and a bulk job uses batch_size× fewer requests
+# against the API's requests-per-minute limit. Each CV is still capped
+# exactly as for a single extraction, and results share the same cache.
+MULTI_PROFILE_TOOL = {
+    "name": "record_profiles",
+    "description": "Record one structured profile per CV, in the order the CVs were given.",
+    "input_schema": {
+        "type": "object",
+        "properties": {
+            "profiles": {"type": "array", "items": PROFILE_TOOL["input_schema"]},
+        },
+        "required": ["profiles"],
+    },
+}
+MULTI_SYSTEM_PROMPT = """You are an expert HR analyst. Given several candidates' CV/resume texts and their stated career goals, extract a structured profile for each CV and record them all, in the order given, with one call to the record_profiles tool.
+
+If a field cannot be determined, use null. For skills, list the top 5-8 most relevant professional skills."""
+MULTI_SYSTEM_BLOCKS = [
+    {"type": "text", "text": MULTI_SYSTEM_PROMPT, "cache_control": {"type": "ephemeral"}},
+]
+MULTI_BATCH_SIZE = 5
+
+
+def extract_profiles_marshalled(
+    items: list[tuple[str, str]], batch_size: int = MULTI_BATCH_SIZE,
+) -> list[dict]:
+    """
+    Extract profiles for many CVs, several CVs per Claude request.
+
+    Args:
+        items      : list of (cv_text, career_goals) pairs
+        batch_size : CVs per request (3-8 is a good trade-off between
+                     fewer requests and a slower, longer reply)
+
+    Returns:
+        One profile dict per item, in the same order. A CV missing from
+        Claude's reply gets the fallback profile (and isn't cached).
+    """
+    messages = [_build_user_message(cv, goals) for cv, goals in items]
+    keys = [_cache_key(m) for m in messages]
+    results = [
+        _fallback_profile(goals) if _too_short(cv) else _cached_profile(k)
+        for (cv, goals), k in zip(items, keys)
+    ]
+    todo = [i for i, profile in enumerate(results) if profile is None]
+
+    for start in range(0, len(todo), batch_size):
+        batch = todo[start:start + batch_size]
+        user_message = "\n\n".join(
+            [f"There are {len(batch)} CVs below. Record one profile per CV, in order."]
+            + [f"### CV {n}\n{messages[i]}" for n, i in enumerate(batch, 1)]
+        )
+        _throttle(MULTI_SYSTEM_PROMPT, user_message, 500 * len(batch))
+        response = _get_client().messages.create(
+            model=MODEL,
+            max_tokens=500 * len(batch),
+            system=MULTI_SYSTEM_BLOCKS,
+            tools=[MULTI_PROFILE_TOOL],
+            tool_choice={"type": "tool", "name": MULTI_PROFILE_TOOL["name"]},
+            messages=[
+                {"role": "user", "content": user_message},
+            ],
+        )
+
+        tool_input = _tool_input(response, MULTI_PROFILE_TOOL["name"])
+        profiles = tool_input.get("profiles") if isinstance(tool_input, dict) else None
+        if not isinstance(profiles, list):
+            profiles = []
+        for n, i in enumerate(batch):
+            career_goals = items[i][1]
+            profile = _complete_profile(profiles[n], career_goals) if n < len(profiles) else None
+            if profile is None:
+                results[i] = _fallback_profile(career_goals)
+                _remember_failure(keys[i], results[i])
+            else:
+                _store_profile(keys[i], profile)
+                results[i] = profile
+
+    return results
@@ -11,16 +11,30 @@ HOW IT WORKS:
   4. Sends it to Claude Sonnet 4 which picks the TOP 3 best-fit programmes
      and writes a personalised outreach email.
   5. Returns the recommendations + email as a JSON dict.
+     (astream_recommend() does the same but streams Claude's reply as it
+     is written — used by main.py's /recommend/stream.)
+     (submit_recommend_batch() / fetch_batch_results() run many at once,
+     asynchronously and at half price, via Anthropic's Message Batches API.)
 
 NOTE: This is NOT a RAG/vector-search approach — we pass ALL programmes
 directly to the LLM and let it choose. This works because the total
 programme catalogue fits within Claude's context window.
 """
 
-import json
+import copy
+import hashlib
+import logging
 import os
-import glob
+import sys
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 import anthropic
+import orjson
+from pydantic_core import from_json
+
+logger = logging.getLogger(__name__)
 
 # ── Configuration ────────────────────────────────────────────────────
 # Path to the folder containing one JSON file per scraped programme.
@@ -30,6 +44,87 @@ PROGRAMME_PAGES_DIR = os.path.join(os.path.dirname(__file__), "programme_pages")
 # Module-level cache — we load programmes from disk once and reuse.
 # This avoids re-reading ~61 JSON files on every /recommend request.
 _programmes_cache = None
+# The system blocks built from it, as (programmes, blocks) — see _build_system().
+_system_cache = None
+
+# Characters of each programme's description kept for the prompt — the
+# snippet is stored at this length, so it is never re-sliced per request.
+SNIPPET_CHARS = 300
+
+# Claude model that picks the programmes and writes the email.
+MODEL = "claude-sonnet-4-20250514"
+
+# Start of Claude's reply, written for it (an assistant-turn "prefill").
+# Claude continues from here, so the reply is the bare JSON object —
+# never wrapped in ```json code fences or preceded by commentary.
+JSON_PREFILL = "{"
+
+# Returned when there is no programme catalogue to recommend from.
+NO_PROGRAMMES_RESULT = {
+    "recommendations": [],
+    "email_draft": "No programmes available.",
+}
+
+# ── Result cache ────────────────────────────────────────────────────
+# Identical inputs (a re-submitted form, the back button, a demo run
+# twice) get the same recommendations + email back without another
+# Claude call. Results are cached in memory by a hash of the model, the
+# profile and the categories, for RESULT_CACHE_TTL seconds; only replies
+# that parsed are cached, never the fallback.
+RESULT_CACHE_SIZE = 1024
+RESULT_CACHE_TTL = 3600
+_result_cache: OrderedDict[str, tuple[float, dict]] = OrderedDict()  # key → (stored_at, result)
+_result_cache_lock = threading.Lock()
+
+# Shared Anthropic clients — created on first use and reused for every
+# call, so requests share one keep-alive (HTTP/2) connection pool instead of
+# building a new client (and TLS connection) each time. The sync client
+# serves recommend(); the async one serves astream_recommend().
+# Bounded timeout and retries (the SDK default timeout is 10 minutes), so a
+# hung connection fails the request instead of tying up a worker. Read
+# timeout: writing 3 recommendations + an email (max_tokens=1500) can take
+# a while; when streaming it bounds each gap between chunks instead.
+# Built with the SDK's own anthropic.Timeout, not httpx's — recent SDK
+# releases run on their own httpx fork and reject httpx objects.
+_HTTP_TIMEOUT = 60.0          # seconds
+_HTTP_CONNECT_TIMEOUT = 5.0
+_MAX_RETRIES = 3
+_client: anthropic.Anthropic | None = None
+_async_client: anthropic.AsyncAnthropic | None = None
+# Guards first-time creation: recommend() runs in worker threads, and
+# two requests racing past the None check would each build a client
+# (and connection pool), one of which would be thrown away.
+_client_lock = threading.Lock()
+
+
+def _get_client() -> anthropic.Anthropic:
+    """Return the shared Anthropic client (uses the CLAUDE_API env var)."""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = anthropic.Anthropic(
+                    api_key=os.environ.get("CLAUDE_API"),
+                    timeout=anthropic.Timeout(_HTTP_TIMEOUT, connect=_HTTP_CONNECT_TIMEOUT),
+                    max_retries=_MAX_RETRIES,
+                    http_client=anthropic.DefaultHttpxClient(http2=True),
+                )
+    return _client
+
+
+def _get_async_client() -> anthropic.AsyncAnthropic:
+    """Return the shared AsyncAnthropic client (uses the CLAUDE_API env var)."""
+    global _async_client
+    if _async_client is None:
+        with _client_lock:
+            if _async_client is None:
+                _async_client = anthropic.AsyncAnthropic(
+                    api_key=os.environ.get("CLAUDE_API"),
+                    timeout=anthropic.Timeout(_HTTP_TIMEOUT, connect=_HTTP_CONNECT_TIMEOUT),
+                    max_retries=_MAX_RETRIES,
+                    http_client=anthropic.DefaultAsyncHttpxClient(http2=True),
+                )
+    return _async_client
 
 
 def load_all_programmes() -> list[dict]:
@@ -38,11 +133,12 @@ def load_all_programmes() -> list[dict]:
 
     Scans every .json file under programme_pages/ (recursively), extracts
     the key fields we need for the LLM prompt, and caches the result in
-    _programmes_cache so subsequent calls are instant.
+    _programmes_cache so subsequent calls are instant — and on disk (see
+    CATALOGUE_CACHE_PATH), so the next cold start skips the parsing too.
 
     Each summary dict contains:
       - title, url, category, fee, format, location, start_date
-      - description_snippet (first 400 chars of the programme description)
+      - description_snippet (first 300 chars of the programme description)
 
     Returns:
         List of programme summary dicts (typically ~61 items).
@@ -51,47 +147,144 @@ def load_all_programmes() -> list[dict]:
     if _programmes_cache is not None:
         return _programmes_cache
 
-    programmes = []
-    json_files = glob.glob(
-        os.path.join(PROGRAMME_PAGES_DIR, "**", "*.json"), recursive=True
-    )
-
-    for path in json_files:
-        with open(path, "r", encoding="utf-8") as f:
-            data = json.load(f)
-        # Skip non-dict entries (e.g. the programmes_database.json array)
-        if not isinstance(data, dict):
-            continue
-        # Skip files that had scraping errors
-        if "error" in data:
-            continue
-
-        # Extract category from the URL path
-        # e.g. ".../programmes-in-accounting-finance/..." → "Accounting Finance"
-        url = data.get("url", "")
-        category = ""
-        if "/programmes/programmes-in-" in url:
-            cat_part = url.split("/programmes/programmes-in-")[1].split("/")[0]
-            category = cat_part.replace("-", " ").title()
-
-        kf = data.get("key_facts", {})
-        description = data.get("description", "")
-
-        programmes.append({
-            "title": data.get("title", "").strip(),
-            "url": url,
-            "category": category,
-            "fee": kf.get("fee", ""),
-            "format": kf.get("format", ""),
-            "location": kf.get("location", ""),
-            "start_date": kf.get("start_date", ""),
-            "description_snippet": description[:400],  # keep it short for the prompt
-        })
+    json_files = list(iter_json_files(PROGRAMME_PAGES_DIR))
+    key = _catalogue_key(json_files)
+    programmes = _load_catalogue(key)
+    if programmes is None:
+        # Cache miss: read the files in parallel — the work is I/O-bound
+        # (open + read per file), so threads overlap the syscall latency.
+        # Up to 16 worker threads (2 per core); map() keeps the file order.
+        max_workers = min(16, (os.cpu_count() or 1) * 2)
+        with ThreadPoolExecutor(max_workers=max_workers) as ex:
+            programmes = [p for p in ex.map(_load_one, json_files) if p is not None]
+        _save_catalogue(key, programmes)
 
     _programmes_cache = programmes
     return programmes
 
 
+def iter_json_files(root: str):
+    """
+    Yield the path of every .json file under `root`, recursively.
+
+    One os.scandir() pass per directory — the directory read already says
+    which entries are files and which are folders, so there is no extra
+    stat() per entry as with glob(recursive=True). Being a generator, it
+    lets a thread pool start loading files before the walk finishes.
+    Shared by main.py and build_vectordb.py.
+    """
+    with os.scandir(root) as entries:
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                yield from iter_json_files(entry.path)
+            elif entry.name.endswith(".json") and entry.is_file(follow_symlinks=False):
+                yield entry.path
+
+
+def _load_one(path: str) -> dict | None:
+    """
+    Read one programme JSON file into a summary dict (see
+    load_all_programmes), or None if it isn't a programme page.
+    """
+    with open(path, "rb") as f:
+        # Skip non-dict files (e.g. the ~2 MB programmes_database.json
+        # array) from their first byte, without parsing them at all.
+        head = f.read(64)
+        if head.lstrip()[:1] != b"{":
+            return None
+        data = orjson.loads(head + f.read())
+    if not isinstance(data, dict):
+        return None
+    # Skip files that had scraping errors
+    if "error" in data:
+        return None
+
+    url = data.get("url", "")
+    kf = data.get("key_facts", {})
+    description = data.get("description", "")
+
+    return {
+        "title": data.get("title", "").strip(),
+        "url": url,
+        "category": _category_for(url),
+        "fee": kf.get("fee", ""),
+        "format": kf.get("format", ""),
+        "location": kf.get("location", ""),
+        "start_date": kf.get("start_date", ""),
+        "description_snippet": description[:SNIPPET_CHARS],  # keep it short for the prompt
+    }
+
+
+# Category slug → display name. There are only a dozen categories across
+# the ~61 programmes, so each name is built once and shared (interned).
+_CATEGORY_NAMES: dict[str, str] = {}
+
+
+def _category_for(url: str) -> str:
+    """
+    Extract the category from a programme URL's path, e.g.
+    ".../programmes-in-accounting-finance/..." → "Accounting Finance".
+    """
+    _, found, rest = url.partition("/programmes/programmes-in-")
+    if not found:
+        return ""
+    slug = rest.partition("/")[0]
+    name = _CATEGORY_NAMES.get(slug)
+    if name is None:
+        name = _CATEGORY_NAMES[slug] = sys.intern(slug.replace("-", " ").title())
+    return name
+
+
+# ── Catalogue cache ─────────────────────────────────────────────────
+# The summaries built from programme_pages/ are also saved as ONE file,
+# so a cold start reads and parses that instead of opening and parsing
+# every programme JSON. The cache is keyed by each source file's path,
+# size and modification time: re-scraping, adding or removing a page
+# changes the key, and the catalogue is rebuilt from the JSON files. So
+# does changing SNIPPET_CHARS, which alters every summary.
+CATALOGUE_CACHE_PATH = os.path.join(os.path.dirname(__file__), ".cache", "programmes.json")
+
+
+def _catalogue_key(json_files: list[str]) -> str:
+    """Hash of the source files' paths, sizes and modification times."""
+    h = hashlib.blake2b(f"v{SNIPPET_CHARS}\n".encode("utf-8"), digest_size=16)
+    for path in json_files:
+        st = os.stat(path)
+        h.update(f"{path}|{st.st_size}|{st.st_mtime_ns}\n".encode("utf-8"))
+    return h.hexdigest()
+
+
+def _load_catalogue(key: str) -> list[dict] | None:
+    """Return the cached catalogue if it was built from the same files, else None."""
+    try:
+        with open(CATALOGUE_CACHE_PATH, "rb") as f:
+            cached = orjson.loads(f.read())
+    except (OSError, ValueError):
+        return None
+    if not isinstance(cached, dict) or cached.get("key") != key:
+        return None
+    return cached.get("programmes")
+
+
+def _save_catalogue(key: str, programmes: list[dict]) -> None:
+    """Write the catalogue cache (disk errors are ignored)."""
+    tmp_path = f"{CATALOGUE_CACHE_PATH}.{os.getpid()}.tmp"
+    try:
+        os.makedirs(os.path.dirname(CATALOGUE_CACHE_PATH), exist_ok=True)
+        with open(tmp_path, "wb") as f:
+            f.write(orjson.dumps({"key": key, "programmes": programmes}))
+        os.replace(tmp_path, CATALOGUE_CACHE_PATH)  # atomic — readers never see a half-written file
+    except OSError:
+        pass
+
+
+def warm_up() -> None:
+    """Load the programme catalogue and create the Anthropic clients ahead of the first request."""
+    load_all_programmes()
+    _get_client()
+    _get_async_client()
+
+
 # ── LLM system prompt ───────────────────────────────────────────────
 # This tells Claude exactly what role to play and what JSON structure
 # to return. Claude sees this as the "system" message.
@@ -129,8 +322,10 @@ def recommend(profile: dict, categories: list[dict]) -> dict:
     Pipeline:
       1. Load all programmes from disk (cached after first call).
       2. Build a rich prompt with the candidate profile + interest categories
-         + the entire programme catalogue.
-      3. Send to Claude Sonnet 4 to pick the top 3 and write an email.
+         + the entire programme catalogue (cached by Anthropic — see
+         _build_system).
+      3. Send to Claude Sonnet 4 to pick the top 3 and write an email
+         (unless the same inputs were answered recently — see _result_cache).
       4. Parse the JSON response and return it.
 
     Args:
@@ -140,86 +335,354 @@ def recommend(profile: dict, categories: list[dict]) -> dict:
                      e.g. [{"category": "Strategy", "score": 0.85}, ...]
 
     Returns:
-        Dict with two keys:
+        Dict with keys:
           - "recommendations" : list of top-3 programme dicts, each with a "reason"
           - "email_draft"     : personalised outreach email as a string
+          - "_meta"           : {"cached": bool, "usage": token counts or None}
+                                (see _log_usage; absent if there are no programmes)
     """
     # ── Step 1: Load all programmes ──────────────────────────────────
     all_programmes = load_all_programmes()
 
     if not all_programmes:
-        return {
-            "recommendations": [],
-            "email_draft": "No programmes available.",
-        }
+        return dict(NO_PROGRAMMES_RESULT)
 
-    # ── Step 2: Build the LLM prompt ────────────────────────────────
-    # We give Claude three blocks of context:
-    #   a) The full candidate profile as pretty-printed JSON
-    #   b) The top 3 interest categories with confidence scores
-    #   c) A formatted list of ALL available programmes
-    candidate_summary = json.dumps(profile, indent=2)
-    category_summary = ", ".join(
-        f"{c['category']} ({c['score']:.0%})" for c in categories[:3]
-    )
-    programme_list = "\n\n".join(
-        f"- {p['title']} ({p['category']})\n"
-        f"  Fee: {p['fee']} | Format: {p['format']} | Location: {p['location']}\n"
-        f"  URL: {p['url']}\n"
-        f"  {p['description_snippet'][:300]}"
-        for p in all_programmes
-    )
+    # Same profile + categories as a recent request → same answer.
+    key = _result_key(profile, categories)
+    result = _cached_result(key)
+    if result is not None:
+        return {**result, "_meta": {"cached": True, "usage": None}}
 
-    user_message = (
-        f"CANDIDATE PROFILE:\n{candidate_summary}\n\n"
-        f"TOP INTEREST AREAS: {category_summary}\n\n"
-        f"ALL AVAILABLE PROGRAMMES ({len(all_programmes)} total):\n{programme_list}"
-    )
+    # ── Step 2: Build the LLM prompt ────────────────────────────────
+    user_message = _build_user_message(profile, categories)
 
     # ── Step 3: Call Claude Sonnet 4 ─────────────────────────────────
-    # Uses the Anthropic SDK. API key comes from the CLAUDE_API env var.
+    # Uses the shared Anthropic client. API key comes from the CLAUDE_API env var.
     # max_tokens=1500 is enough for 3 recommendations + a short email.
-    client = anthropic.Anthropic(api_key=os.environ.get("CLAUDE_API"))
-
-    response = client.messages.create(
-        model="claude-sonnet-4-20250514",
+    response = _get_client().messages.create(
+        model=MODEL,
         max_tokens=1500,
-        system=RECOMMEND_PROMPT,
+        system=_build_system(all_programmes),
         messages=[
             {"role": "user", "content": user_message},
+            {"role": "assistant", "content": JSON_PREFILL},
         ],
     )
 
-    content = response.content[0].text.strip()
+    usage = _log_usage(response.usage)
 
     # ── Step 4: Parse the JSON response ──────────────────────────────
-    # Claude sometimes wraps its JSON in markdown code fences (```json...```)
-    # so we strip those before parsing.
-    if content.startswith("```"):
-        content = content.split("```")[1]
-        if content.startswith("json"):
-            content = content[4:]
+    # Claude's reply continues the prefilled "{", so put it back in front.
+    result = _result_from_reply(key, JSON_PREFILL + response.content[0].text, all_programmes)
+    return {**result, "_meta": {"cached": False, "usage": usage}}
+
 
+async def astream_recommend(profile: dict, categories: list[dict]):
+    """
+    Streaming, async version of recommend() — same prompt, same result.
+
+    Yields ("delta", text) for each chunk of Claude's reply as it is
+    generated (raw JSON text — useful to show progress), and
+    ("recommendation", dict) as soon as each recommended programme is
+    complete — well before the email is written — then a final
+    ("result", dict) with the parsed recommendations + email, exactly as
+    recommend() would return them.
+    """
+    all_programmes = load_all_programmes()
+
+    if not all_programmes:
+        yield "result", dict(NO_PROGRAMMES_RESULT)
+        return
+
+    # A cached result is sent straight away, with no deltas.
+    key = _result_key(profile, categories)
+    result = _cached_result(key)
+    if result is not None:
+        yield "result", {**result, "_meta": {"cached": True, "usage": None}}
+        return
+
+    user_message = _build_user_message(profile, categories)
+
+    chunks = [JSON_PREFILL]
+    sent = 0          # recommendations already yielded
+    yield "delta", JSON_PREFILL
+    async with _get_async_client().messages.stream(
+        model=MODEL,
+        max_tokens=1500,
+        system=_build_system(all_programmes),
+        messages=[
+            {"role": "user", "content": user_message},
+            {"role": "assistant", "content": JSON_PREFILL},
+        ],
+    ) as stream:
+        async for text in stream.text_stream:
+            chunks.append(text)
+            yield "delta", text
+            for rec in _completed_recommendations("".join(chunks))[sent:]:
+                sent += 1
+                yield "recommendation", rec
+        usage = _log_usage((await stream.get_final_message()).usage)
+
+    result = _result_from_reply(key, "".join(chunks), all_programmes)
+    yield "result", {**result, "_meta": {"cached": False, "usage": usage}}
+
+
+def _result_key(profile: dict, categories: list[dict]) -> str:
+    """BLAKE2b hash of the model + the canonicalised (profile, categories)."""
+    payload = orjson.dumps([MODEL, profile, categories], option=orjson.OPT_SORT_KEYS)
+    return hashlib.blake2b(payload, digest_size=16).hexdigest()
+
+
+def _cached_result(key: str) -> dict | None:
+    """Return a copy of a cached result younger than RESULT_CACHE_TTL, or None."""
+    with _result_cache_lock:
+        entry = _result_cache.get(key)
+        if entry is None:
+            return None
+        stored_at, result = entry
+        if stored_at < time.time() - RESULT_CACHE_TTL:
+            del _result_cache[key]
+            return None
+        _result_cache.move_to_end(key)
+        return copy.deepcopy(result)
+
+
+def _store_result(key: str, result: dict) -> None:
+    """Cache a result, evicting the least recently used."""
+    with _result_cache_lock:
+        _result_cache[key] = (time.time(), copy.deepcopy(result))
+        _result_cache.move_to_end(key)
+        if len(_result_cache) > RESULT_CACHE_SIZE:
+            _result_cache.popitem(last=False)
+
+
+def _completed_recommendations(partial: str) -> list[dict]:
+    """
+    The recommendations that are complete in Claude's partial JSON reply.
+
+    The reply is parsed as far as it goes (pydantic_core's partial-JSON
+    mode). A recommendation is complete once the next one has started,
+    or once "email_draft" — which follows the list — has begun.
+    """
     try:
-        result = json.loads(content)
-    except json.JSONDecodeError:
-        # FALLBACK: if Claude returned malformed JSON, we still give
-        # the user something useful by returning the first 3 programmes
-        # from the catalogue with generic reasons.
-        result = {
-            "recommendations": [
-                {
-                    "title": p["title"],
-                    "url": p["url"],
-                    "category": p["category"],
-                    "fee": p["fee"],
-                    "format": p["format"],
-                    "location": p["location"],
-                    "reason": f"Matched based on your interest in {p['category']}.",
-                }
-                for p in all_programmes[:3]
-            ],
-            "email_draft": content,  # raw Claude text as a fallback
+        obj = from_json(partial, allow_partial="trailing-strings")
+    except ValueError:
+        return []
+    if not isinstance(obj, dict):
+        return []
+    recs = obj.get("recommendations")
+    if not isinstance(recs, list):
+        return []
+    done = recs if "email_draft" in obj else recs[:-1]
+    return [r for r in done if isinstance(r, dict)]
+
+
+def _log_usage(usage) -> dict:
+    """
+    Log a reply's token usage, including how much of the prompt was
+    written to / read from Anthropic's prompt cache — a cache read on
+    most requests confirms the catalogue prefix is being reused.
+
+    Returns:
+        The counts as a dict, which recommend() / astream_recommend()
+        return under the result's "_meta" key (and main.py passes on).
+    """
+    counts = {
+        "input_tokens": usage.input_tokens,
+        "cache_creation_input_tokens": getattr(usage, "cache_creation_input_tokens", None),
+        "cache_read_input_tokens": getattr(usage, "cache_read_input_tokens", None),
+        "output_tokens": usage.output_tokens,
+    }
+    logger.debug(
+        "Claude usage: %s input, %s cache write, %s cache read, %s output tokens",
+        counts["input_tokens"], counts["cache_creation_input_tokens"],
+        counts["cache_read_input_tokens"], counts["output_tokens"],
+        extra={"claude_usage": counts},
+    )
+    return counts
+
+
+# ── Batch recommendations ───────────────────────────────────────────
+# For jobs that don't need an answer straight away (bulk intake, nightly
+# re-scoring): Anthropic's Message Batches API runs the same requests
+# asynchronously — usually within the hour, at most 24 hours — at half
+# the price of recommend(). Submit, keep the batch ID, poll for results.
+
+def submit_recommend_batch(jobs: list[tuple[dict, list[dict]]]) -> str:
+    """
+    Submit many recommendation requests as one Message Batch.
+
+    Each job gets exactly the prompt recommend() would send (including
+    the cached catalogue prefix).
+
+    Args:
+        jobs : list of (profile, categories) pairs, as passed to recommend()
+
+    Returns:
+        The batch ID — pass it to fetch_batch_results() to collect the results.
+    """
+    all_programmes = load_all_programmes()
+    system = _build_system(all_programmes)
+    batch = _get_client().messages.batches.create(requests=[
+        {
+            "custom_id": f"job-{i}",
+            "params": {
+                "model": MODEL,
+                "max_tokens": 1500,
+                "system": system,
+                "messages": [
+                    {"role": "user", "content": _build_user_message(profile, categories)},
+                    {"role": "assistant", "content": JSON_PREFILL},
+                ],
+            },
         }
+        for i, (profile, categories) in enumerate(jobs)
+    ])
+    return batch.id
+
+
+def fetch_batch_results(batch_id: str) -> list[dict] | None:
+    """
+    Collect the results of a submit_recommend_batch() batch.
+
+    Returns:
+        None while the batch is still processing; once it has ended, one
+        dict per job in submission order — as recommend() returns, or
+        {"error": ..., "recommendations": [], "email_draft": ""} for a job
+        that failed, expired or was cancelled.
+    """
+    client = _get_client()
+    if client.messages.batches.retrieve(batch_id).processing_status != "ended":
+        return None
+
+    all_programmes = load_all_programmes()
+    results = {}
+    for entry in client.messages.batches.results(batch_id):
+        if entry.result.type == "succeeded":
+            content = JSON_PREFILL + entry.result.message.content[0].text
+            results[entry.custom_id], _ = _parse_result(content, all_programmes)
+        else:
+            results[entry.custom_id] = {
+                "error": f"Batch request {entry.result.type}.",
+                "recommendations": [],
+                "email_draft": "",
+            }
+    # Results arrive in any order — put them back in submission order.
+    return [results[k] for k in sorted(results, key=lambda k: int(k.split("-")[1]))]
+
+
+def _build_system(all_programmes: list[dict]) -> list[dict]:
+    """
+    Build the system blocks sent to Claude: the RECOMMEND_PROMPT
+    instructions followed by a formatted list of ALL available programmes.
+
+    The catalogue is by far the largest part of the prompt and is the same
+    for every candidate, so it goes here (not in the user message) and is
+    marked with cache_control: Anthropic then caches the whole prefix
+    (instructions + catalogue) for 5 minutes, and repeat requests skip
+    re-processing it — lower time-to-first-token and input-token cost.
+    The text is built the same way every time, so the prefix matches.
+
+    The blocks only depend on the catalogue, so they are built once per
+    catalogue (_system_cache) rather than re-formatted on every request.
+    """
+    global _system_cache
+    if _system_cache is not None and _system_cache[0] is all_programmes:
+        return _system_cache[1]
+
+    # One pipe-delimited line per programme under a header row, rather
+    # than four labelled lines each — same information, far fewer tokens.
+    programme_list = "\n".join(
+        [_CATALOGUE_HEADER]
+        + [
+            _catalogue_row(
+                p["title"], p["category"], p["fee"], p["format"],
+                p["location"], p["url"], p["description_snippet"],
+            )
+            for p in all_programmes
+        ]
+    )
+    system = [
+        {"type": "text", "text": RECOMMEND_PROMPT},
+        {
+            "type": "text",
+            "text": f"ALL AVAILABLE PROGRAMMES ({len(all_programmes)} total):\n{programme_list}",
+            "cache_control": {"type": "ephemeral"},
+        },
+    ]
+    _system_cache = (all_programmes, system)
+    return system
+
+
+_CATALOGUE_HEADER = "TITLE|CATEGORY|FEE|FORMAT|LOCATION|URL|SUMMARY"
+
 
+def _catalogue_row(*fields: str) -> str:
+    """One catalogue line: fields joined by "|", each flattened to a single line."""
+    return "|".join(" ".join(str(f).split()).replace("|", "/") for f in fields)
+
+
+def _build_user_message(profile: dict, categories: list[dict]) -> str:
+    """
+    Build the user message sent to Claude.
+
+    We give Claude two blocks of context about the candidate (the
+    programme catalogue is in the system prompt — see _build_system):
+      a) The full candidate profile as compact JSON
+      b) The top 3 interest categories with confidence scores
+    """
+    candidate_summary = orjson.dumps(profile).decode()   # compact — indentation only costs tokens
+    category_summary = ", ".join(
+        f"{c['category']} ({c['score']:.0%})" for c in categories[:3]
+    )
+
+    return (
+        f"CANDIDATE PROFILE:\n{candidate_summary}\n\n"
+        f"TOP INTEREST AREAS: {category_summary}"
+    )
+
+
+def _parse_result(content: str, all_programmes: list[dict]) -> tuple[dict, bool]:
+    """
+    Turn Claude's raw reply (with the JSON_PREFILL put back) into the
+    recommendations + email dict.
+
+    Returns:
+        (result, parsed) — parsed is False when the reply wasn't valid
+        JSON and result is the _fallback_result() instead.
+    """
+    try:
+        return orjson.loads(content), True
+    except orjson.JSONDecodeError:
+        return _fallback_result(content, all_programmes), False
+
+
+def _result_from_reply(key: str, content: str, all_programmes: list[dict]) -> dict:
+    """Parse Claude's reply (see _parse_result), caching it only if valid."""
+    result, parsed = _parse_result(content, all_programmes)
+    if parsed:
+        _store_result(key, result)
     return result
+
+
+def _fallback_result(content: str, all_programmes: list[dict]) -> dict:
+    """
+    FALLBACK: if Claude returned malformed JSON, we still give the user
+    something useful by returning the first 3 programmes from the
+    catalogue with generic reasons.
+    """
+    return {
+        "recommendations": [
+            {
+                "title": p["title"],
+                "url": p["url"],
+                "category": p["category"],
+                "fee": p["fee"],
+                "format": p["format"],
+                "location": p["location"],
+                "reason": f"Matched based on your interest in {p['category']}.",
+            }
+            for p in all_programmes[:3]
+        ],
+        "email_draft": content,  # raw Claude text as a fallback
+    }
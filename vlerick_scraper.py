@@ -2,188 +2,380 @@
 Vlerick Programme Page Scraper
 Reads vlerick_all_urls.json and scrapes each programme page,
 saving full content as individual files + a combined JSON database.
-Uses Playwright (headless browser) to render JS-heavy pages.
+Uses Playwright (headless browser) to render JS-heavy pages, with
+CONCURRENCY pages loading at once (one browser, one context per worker).
 Saves after each page so no data is lost if interrupted.
 """
 
-import json
+import asyncio
 import os
 import re
-import time
-from playwright.sync_api import sync_playwright
+import orjson
+from playwright.async_api import async_playwright
+
+# Optional: google-re2 (`pip install google-re2`) runs the fact scan as a
+# linear-time DFA, much faster than `re` on long page text. Falls back to
+# `re` when it isn't installed.
+try:
+    import re2
+except ImportError:
+    re2 = None
 
 BASE_URL = "https://www.vlerick.com"
 URLS_FILE = "vlerick_all_urls.json"
+# Per-programme Algolia metadata written by vlerickcrawl.py
+ALGOLIA_DATA_FILE = "vlerick_programmes_data.json"
 OUTPUT_DIR = "programme_pages"
 COMBINED_FILE = "programmes_database.json"
+# Append-only log of scraped records, one JSON object per line. Each page
+# adds one line, instead of rewriting the whole combined JSON every time;
+# COMBINED_FILE is rebuilt from the records every SAVE_EVERY pages and at the end.
+JOURNAL_FILE = "programmes_database.jsonl"
+SAVE_EVERY = 25
+# Buffer size for the per-programme files, so each one (the text file is
+# built from many small writes) goes to disk in a single write call
+FILE_BUFFER = 1 << 20
+
+# FAST_MODE (env SCRAPER_FAST_MODE=1): build records straight from the
+# Algolia metadata in ALGOLIA_DATA_FILE instead of loading each page. Only
+# URLs without an Algolia hit are opened in the browser. Fast records have
+# no sections/foldables/testimonials and are marked "source": "algolia";
+# a later normal run re-scrapes them in full.
+FAST_MODE = os.environ.get("SCRAPER_FAST_MODE", "") == "1"
+ALGOLIA_SOURCE = "algolia"
+
+# Main content block of a programme page; its appearance means the page's
+# scripts have rendered and it's ready to extract.
+CONTENT_SELECTOR = "#vlerick\\:body, .c-body, main"
+
+# Pages scraped at the same time. Each page load is mostly waiting on the
+# network, so several workers overlap that waiting; each still pauses
+# PAGE_DELAY seconds between its own pages to stay polite to the site.
+CONCURRENCY = 8
+PAGE_DELAY = 1.0
+# Each worker replaces its browser context after this many pages, so the
+# cookies, caches and JS heap a context accumulates don't grow for the whole
+# run, while the cost of creating a context is only paid now and then.
+PAGES_PER_CONTEXT = 50
+USER_AGENT = (
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
+    "AppleWebKit/537.36 (KHTML, like Gecko) "
+    "Chrome/120.0.0.0 Safari/537.36"
+)
+
+# Requests the scraper never needs. extract_programme_data() only reads the
+# DOM, so images, fonts and video (and analytics/search widgets) are
+# aborted before they download. Stylesheets are still loaded: the text is
+# read through innerText, which leaves out CSS-hidden elements (collapsed
+# panels, mobile-only menus, cookie banners) only when the CSS is there.
+BLOCKED_RESOURCE_TYPES = {"image", "font", "media"}
+BLOCKED_HOSTS = (
+    "https://www.googletagmanager.com/",
+    "https://www.google-analytics.com/",
+    "https://analytics.google.com/",
+    "https://connect.facebook.net/",
+    "https://snap.licdn.com/",
+    "https://px.ads.linkedin.com/",
+    "https://static.hotjar.com/",
+    "https://script.hotjar.com/",
+    "https://cdn.cookielaw.org/",
+)
+BLOCKED_HOST_SUFFIXES = (".algolia.net", ".algolianet.com", ".algolia.io")
+
+
+# ── Compiled regexes ────────────────────────────────────────────────
+# Compiled once at import rather than looked up in re's cache on every call.
+_SLUG_NONWORD = re.compile(r"[^\w\s-]")
+_SLUG_WS = re.compile(r"[\s_]+")
+_SLUG_DASHES = re.compile(r"-+")
+
+# Labelled facts looked for in the page text when the hero ribbon lacks
+# them. All six are fused into one alternation so the (often long) page
+# text is scanned once; the value group of each branch is named after its
+# key, so match.lastgroup says which fact matched.
+_FACT_PATTERNS = {
+    "fee": r"(?:Fee|Price|Cost)[:\s]*(?P<fee>[€$£][\d,.]+[^\n]*)",
+    "duration": r"(?:Duration)[:\s]*(?P<duration>\d+[^\n]*)",
+    "format": r"(?:Format)[:\s]*(?P<format>[^\n]+)",
+    "location": r"(?:Location)[:\s]*(?P<location>[^\n]+)",
+    "language": r"(?:Language)[:\s]*(?P<language>[^\n]+)",
+    "start_date": r"(?:Upcoming edition|Start date|Next edition|Starting)[:\s]*(?P<start_date>[^\n]+)",
+}
+
+
+def _compile_facts_regex(pattern):
+    """Compile the fused fact regex case-insensitively, with RE2 if available."""
+    if re2 is not None:
+        options = re2.Options()
+        options.case_sensitive = False
+        return re2.compile(pattern, options)
+    return re.compile(pattern, re.IGNORECASE)
+
+
+_FACTS_RX = _compile_facts_regex("|".join(_FACT_PATTERNS.values()))
+
+# ISO 8601 durations as used by schema.org timeRequired, e.g. "P5D", "P2W", "PT16H"
+_ISO_DURATION = re.compile(
+    r"P(?:(?P<years>\d+)Y)?(?:(?P<months>\d+)M)?(?:(?P<weeks>\d+)W)?"
+    r"(?:(?P<days>\d+)D)?(?:T(?:(?P<hours>\d+)H)?(?:(?P<minutes>\d+)M)?)?$"
+)
+_CURRENCY_SYMBOLS = {"EUR": "€", "USD": "$", "GBP": "£"}
+_JSON_LD_TYPES = {"Course", "EducationEvent", "CourseInstance"}
 
 
 def slugify(text):
     """Convert text to a safe filename."""
     text = text.lower().strip()
-    text = re.sub(r"[^\w\s-]", "", text)
-    text = re.sub(r"[\s_]+", "-", text)
-    text = re.sub(r"-+", "-", text)
+    text = _SLUG_NONWORD.sub("", text)
+    text = _SLUG_WS.sub("-", text)
+    text = _SLUG_DASHES.sub("-", text)
     return text.strip("-")
 
 
-def extract_programme_data(page, url):
+# ── In-page DOM harvest ─────────────────────────────────────────────
+# Collects every field extract_programme_data() needs in one page.evaluate()
+# call, instead of a browser round-trip per locator count / inner_text.
+# Returns raw innerText strings; the filtering and regex work stays in Python.
+JS_EXTRACT = r"""
+() => {
+    const text = (el) => (el ? el.innerText.trim() : "");
+    const all = (sel, root = document) => Array.from(root.querySelectorAll(sel));
+
+    // <details> blocks only expose their content once opened
+    for (const d of all("details")) d.open = true;
+
+    let ribbon = all("[class*='ribbon'] [class*='item'], [class*='hero'] [class*='key-fact'], [class*='hero-bottom']");
+    if (ribbon.length === 0) {
+        ribbon = all(".c-hero__bottom-ribbon-item, .c-keyfact, [data-kontent-element-codename*='key']");
+    }
+
+    // A heading's content is the text of the siblings after it, up to the
+    // next heading (or a block that contains one). Headings with no such
+    // siblings (e.g. wrapped on their own) fall back to their parent's text.
+    const HEADING = "h2, h3";
+    const sectionContent = (h) => {
+        const parts = [];
+        for (let n = h.nextElementSibling; n; n = n.nextElementSibling) {
+            if (n.matches(HEADING) || n.querySelector(HEADING)) break;
+            const t = text(n);
+            if (t) parts.push(t);
+        }
+        return parts.length ? parts.join("\n") : text(h.parentElement);
+    };
+
+    const headings = new Set();
+    for (const body of all("#vlerick\\:body, .c-body, main")) {
+        for (const h of all(HEADING, body)) headings.add(h);
+    }
+
+    // The page text is serialised once: the main content container when
+    // there's exactly one, otherwise the whole body. The hero sits outside
+    // the container, so its (short) text is sent alongside for the fact scan.
+    const main = all("#vlerick\\:body, .c-body");
+    const hasMain = main.length === 1;
+
+    const jsonLd = all('script[type="application/ld+json"]').map((s) => s.textContent);
+
+    return {
+        title: text(document.querySelector("h1")),
+        subtitle: text(document.querySelector(".c-hero__subtitle")),
+        key_fact_items: ribbon.map(text),
+        json_ld: jsonLd,
+        full_text: hasMain ? text(main[0]) : (document.body ? document.body.innerText : ""),
+        hero_text: hasMain ? text(document.querySelector("[class*='hero']")) : "",
+        description: text(document.querySelector(".c-intro, [class*='intro'], [class*='lead-text']")),
+        sections: Array.from(headings, (h) => ({
+            heading: text(h),
+            content: sectionContent(h),
+        })),
+        foldable_sections: all("[class*='foldable'], [class*='accordion'], [class*='collapse'], details").map(text),
+        testimonials: all("[class*='testimonial'], [class*='quote'], blockquote").map(text),
+        contact: all("[class*='contact-card'], [class*='contact']").slice(0, 3).map(text),
+    };
+}
+"""
+
+# Clicks every expand button on the page in one round-trip. Foldables with
+# no button inside are clicked themselves (as the extractor used to do per
+# foldable), since with stylesheets loaded their collapsed text is hidden.
+JS_EXPAND = r"""
+() => {
+    const buttons = document.querySelectorAll(
+        "[class*='foldable'] button, [class*='accordion'] button, button[aria-expanded='false']"
+    );
+    for (const b of buttons) {
+        try { b.click(); } catch (e) {}
+    }
+    const foldables = document.querySelectorAll(
+        "[class*='foldable'], [class*='accordion'], [class*='collapse']"
+    );
+    for (const f of foldables) {
+        if (f.querySelector("button")) continue;
+        try { f.click(); } catch (e) {}
+    }
+}
+"""
+
+
+def _json_ld_nodes(blocks):
+    """Yield every JSON object in the page's JSON-LD blocks (incl. @graph / nested instances)."""
+    stack = []
+    for block in blocks:
+        try:
+            stack.append(orjson.loads(block))
+        except orjson.JSONDecodeError:
+            continue
+    while stack:
+        node = stack.pop()
+        if isinstance(node, list):
+            stack.extend(node)
+        elif isinstance(node, dict):
+            yield node
+            for child in ("@graph", "hasCourseInstance"):
+                if child in node:
+                    stack.append(node[child])
+
+
+def _ld_text(value):
+    """Flatten a schema.org value (string, list, or {"name": ...}) to text."""
+    if isinstance(value, list):
+        return ", ".join(filter(None, (_ld_text(v) for v in value)))
+    if isinstance(value, dict):
+        return _ld_text(value.get("name") or value.get("address") or "")
+    return str(value).strip() if value is not None else ""
+
+
+def _ld_duration(value):
+    """Render an ISO 8601 duration ("P5D") readably ("5 days"); other text as is."""
+    text = _ld_text(value)
+    match = _ISO_DURATION.match(text)
+    if not match or not any(match.groupdict().values()):
+        return text
+    return " ".join(
+        f"{n} {unit if n != '1' else unit[:-1]}"
+        for unit, n in match.groupdict().items() if n
+    )
+
+
+def _ld_fee(offers):
+    """Format schema.org offers as a fee string, e.g. "€5950"."""
+    for offer in offers if isinstance(offers, list) else [offers]:
+        if isinstance(offer, dict) and offer.get("price") not in (None, ""):
+            currency = offer.get("priceCurrency", "")
+            symbol = _CURRENCY_SYMBOLS.get(currency)
+            return f"{symbol}{offer['price']}" if symbol else f"{offer['price']} {currency}".strip()
+    return ""
+
+
+def facts_from_json_ld(blocks):
+    """
+    Map Course / EducationEvent JSON-LD onto the key_facts keys.
+
+    Args:
+        blocks : text of each <script type="application/ld+json"> on the page
+
+    Returns:
+        Dict with whichever of fee, duration, format, location, language and
+        start_date the structured data provides (first value found wins).
+    """
+    facts = {}
+    for node in _json_ld_nodes(blocks):
+        types = node.get("@type", [])
+        if isinstance(types, str):
+            types = [types]
+        if not _JSON_LD_TYPES.intersection(types):
+            continue
+        for key, value in (
+            ("fee", _ld_fee(node.get("offers"))),
+            ("duration", _ld_duration(node.get("timeRequired") or node.get("duration") or "")),
+            ("format", _ld_text(node.get("courseMode") or node.get("eventAttendanceMode") or "")),
+            ("location", _ld_text(node.get("location") or "")),
+            ("language", _ld_text(node.get("inLanguage") or "")),
+            ("start_date", _ld_text(node.get("startDate") or "")),
+        ):
+            if value and key not in facts:
+                facts[key] = value
+    return facts
+
+
+async def extract_programme_data(page, url):
     """
     Extract all information from a rendered programme page.
     Returns a dict with all scraped data.
+
+    The DOM is read in one page.evaluate(JS_EXTRACT) round-trip; the raw
+    text it returns is then filtered and parsed here.
     """
     data = {"url": url}
-
-    # --- Title & Subtitle ---
     try:
-        h1 = page.locator("h1").first
-        data["title"] = h1.inner_text().strip() if h1.count() > 0 else ""
+        raw = await page.evaluate(JS_EXTRACT)
     except Exception:
-        data["title"] = ""
+        raw = {}
 
-    try:
-        subtitle = page.locator(".c-hero__subtitle").first
-        data["subtitle"] = subtitle.inner_text().strip() if subtitle.count() > 0 else ""
-    except Exception:
-        data["subtitle"] = ""
+    # --- Title & Subtitle ---
+    data["title"] = raw.get("title", "")
+    data["subtitle"] = raw.get("subtitle", "")
 
     # --- Hero Key Facts (Fee, Format, Location, Date, Duration) ---
     data["key_facts"] = {}
-    try:
-        # The key facts ribbon items in the hero section
-        ribbon_items = page.locator("[class*='ribbon'] [class*='item'], [class*='hero'] [class*='key-fact'], [class*='hero-bottom']")
-        if ribbon_items.count() == 0:
-            # Try alternative selectors for fact items
-            ribbon_items = page.locator(".c-hero__bottom-ribbon-item, .c-keyfact, [data-kontent-element-codename*='key']")
-
-        for i in range(ribbon_items.count()):
-            try:
-                item_text = ribbon_items.nth(i).inner_text().strip()
-                if item_text:
-                    lines = [l.strip() for l in item_text.split("\n") if l.strip()]
-                    if len(lines) >= 2:
-                        data["key_facts"][lines[0]] = " ".join(lines[1:])
-            except Exception:
-                continue
-    except Exception:
-        pass
-
-    # --- Try extracting facts from the full page text with known labels ---
-    full_text = ""
-    try:
-        full_text = page.locator("body").inner_text()
-    except Exception:
-        pass
-
-    fact_patterns = {
-        "fee": r"(?:Fee|Price|Cost)[:\s]*([€$£][\d,.]+[^\n]*)",
-        "duration": r"(?:Duration)[:\s]*(\d+[^\n]*)",
-        "format": r"(?:Format)[:\s]*([^\n]+)",
-        "location": r"(?:Location)[:\s]*([^\n]+)",
-        "language": r"(?:Language)[:\s]*([^\n]+)",
-        "start_date": r"(?:Upcoming edition|Start date|Next edition|Starting)[:\s]*([^\n]+)",
-    }
-    for key, pattern in fact_patterns.items():
-        if key not in data["key_facts"]:
-            match = re.search(pattern, full_text, re.IGNORECASE)
-            if match:
-                data["key_facts"][key] = match.group(1).strip()
+    for item_text in raw.get("key_fact_items", []):
+        if item_text:
+            lines = [l.strip() for l in item_text.split("\n") if l.strip()]
+            if len(lines) >= 2:
+                data["key_facts"][lines[0]] = " ".join(lines[1:])
+
+    # --- Structured facts from the page's JSON-LD (Course schema) ---
+    for key, value in facts_from_json_ld(raw.get("json_ld", [])).items():
+        data["key_facts"].setdefault(key, value)
+
+    # --- Try extracting any facts still missing from the page text ---
+    full_text = raw.get("full_text", "")
+    missing = set(_FACT_PATTERNS) - data["key_facts"].keys()
+    if missing:
+        hero_text = raw.get("hero_text", "")
+        fact_text = f"{hero_text}\n{full_text}" if hero_text else full_text
+
+        # First match of each label wins; known facts are never overwritten
+        for match in _FACTS_RX.finditer(fact_text):
+            key = match.lastgroup
+            if key in missing:
+                missing.discard(key)
+                data["key_facts"][key] = match.group(key).strip()
+                if not missing:
+                    break
 
     # --- Description / Intro ---
-    data["description"] = ""
-    try:
-        intro = page.locator(".c-intro, [class*='intro'], [class*='lead-text']").first
-        if intro.count() > 0:
-            data["description"] = intro.inner_text().strip()
-    except Exception:
-        pass
+    data["description"] = raw.get("description", "")
 
-    # --- All body sections ---
-    data["sections"] = []
-    try:
-        # Get all content sections in the body
-        body = page.locator("#vlerick\\:body, .c-body, main")
-        if body.count() > 0:
-            # Find all heading + content pairs
-            headings = body.locator("h2, h3")
-            for i in range(headings.count()):
-                try:
-                    heading_text = headings.nth(i).inner_text().strip()
-                    if heading_text and len(heading_text) > 1:
-                        # Get the next sibling content
-                        parent = headings.nth(i).locator("..")
-                        section_text = parent.inner_text().strip() if parent.count() > 0 else ""
-                        data["sections"].append({
-                            "heading": heading_text,
-                            "content": section_text
-                        })
-                except Exception:
-                    continue
-    except Exception:
-        pass
+    # --- All body sections (heading + the text of its parent block) ---
+    data["sections"] = [
+        section for section in raw.get("sections", [])
+        if len(section["heading"]) > 1
+    ]
 
     # --- Foldable/Accordion content (programme structure, modules, etc.) ---
-    data["foldable_sections"] = []
-    try:
-        foldables = page.locator("[class*='foldable'], [class*='accordion'], [class*='collapse'], details")
-        for i in range(foldables.count()):
-            try:
-                # Click to expand if needed
-                try:
-                    foldables.nth(i).click(timeout=1000)
-                    page.wait_for_timeout(300)
-                except Exception:
-                    pass
-
-                fold_text = foldables.nth(i).inner_text().strip()
-                if fold_text and len(fold_text) > 10:
-                    data["foldable_sections"].append(fold_text)
-            except Exception:
-                continue
-    except Exception:
-        pass
+    data["foldable_sections"] = [
+        fold_text for fold_text in raw.get("foldable_sections", [])
+        if len(fold_text) > 10
+    ]
 
     # --- Testimonials ---
-    data["testimonials"] = []
-    try:
-        testimonials = page.locator("[class*='testimonial'], [class*='quote'], blockquote")
-        for i in range(testimonials.count()):
-            try:
-                t_text = testimonials.nth(i).inner_text().strip()
-                if t_text and len(t_text) > 20:
-                    data["testimonials"].append(t_text)
-            except Exception:
-                continue
-    except Exception:
-        pass
+    data["testimonials"] = [
+        t_text for t_text in raw.get("testimonials", [])
+        if len(t_text) > 20
+    ]
 
     # --- Contact information ---
     data["contact"] = {}
-    try:
-        contact_section = page.locator("[class*='contact-card'], [class*='contact']")
-        for i in range(min(contact_section.count(), 3)):
-            try:
-                c_text = contact_section.nth(i).inner_text().strip()
-                if c_text and len(c_text) > 10:
-                    data["contact"]["info"] = c_text
-                    break
-            except Exception:
-                continue
-    except Exception:
-        pass
+    for c_text in raw.get("contact", []):
+        if len(c_text) > 10:
+            data["contact"]["info"] = c_text
+            break
 
     # --- Full page text (clean version for RAG/embeddings) ---
-    data["full_text"] = ""
-    try:
-        # Get the main content area text, excluding header/footer/nav
-        main_content = page.locator("#vlerick\\:body, .c-body")
-        if main_content.count() > 0:
-            data["full_text"] = main_content.inner_text().strip()
-        else:
-            # Fallback: get everything between hero and footer
-            data["full_text"] = full_text
-    except Exception:
-        data["full_text"] = full_text
+    # Main content area text, excluding header/footer/nav; falls back to the
+    # whole page text
+    data["full_text"] = full_text
 
     return data
 
@@ -200,12 +392,12 @@ def save_programme_file(data, output_dir):
 
     # Save JSON
     json_path = os.path.join(cat_dir, f"{url_slug}.json")
-    with open(json_path, "w", encoding="utf-8") as f:
-        json.dump(data, f, indent=4, ensure_ascii=False)
+    with open(json_path, "wb") as f:
+        f.write(orjson.dumps(data, option=orjson.OPT_INDENT_2))
 
     # Save readable text file
     txt_path = os.path.join(cat_dir, f"{url_slug}.txt")
-    with open(txt_path, "w", encoding="utf-8") as f:
+    with open(txt_path, "w", encoding="utf-8", buffering=FILE_BUFFER) as f:
         f.write(f"{'=' * 70}\n")
         f.write(f"PROGRAMME: {data.get('title', 'N/A')}\n")
         f.write(f"{'=' * 70}\n\n")
@@ -255,112 +447,282 @@ def save_programme_file(data, output_dir):
 
 
 def load_progress(output_dir):
-    """Load already-scraped URLs to allow resuming."""
-    scraped = set()
+    """
+    Load already-scraped records to allow resuming.
+
+    Reads the JSONL journal line by line. A partly written last line (from
+    an interrupted run) is dropped and the journal rewritten without it, so
+    new appends start on a clean line. A combined JSON left by an older run
+    without a journal is copied into a new journal so later appends extend it.
+    """
+    journal_path = os.path.join(output_dir, JOURNAL_FILE)
+    records = []
+    if os.path.exists(journal_path):
+        damaged = False
+        with open(journal_path, "rb") as f:
+            for line in f:
+                try:
+                    records.append(orjson.loads(line))
+                except orjson.JSONDecodeError:
+                    damaged = True
+        if damaged:
+            _write_journal(records, journal_path)
+        return records
+
     combined_path = os.path.join(output_dir, COMBINED_FILE)
     if os.path.exists(combined_path):
-        with open(combined_path, "r", encoding="utf-8") as f:
-            existing = json.load(f)
-            for item in existing:
-                scraped.add(item.get("url", ""))
-    return scraped
+        with open(combined_path, "rb") as f:
+            records = orjson.loads(f.read())
+        _write_journal(records, journal_path)
+    return records
+
+
+def _write_journal(records, journal_path):
+    """Rewrite the whole JSONL journal from a list of records."""
+    with open(journal_path, "wb") as f:
+        for item in records:
+            f.write(orjson.dumps(item) + b"\n")
+
+
+def append_record(journal, data):
+    """Append one scraped record to the open JSONL journal."""
+    journal.write(orjson.dumps(data) + b"\n")
+    journal.flush()
+
+
+def sync_journal(journal):
+    """Force the journal's appended records to disk (see record())."""
+    os.fsync(journal.fileno())
 
 
 def save_combined(all_data, output_dir):
-    """Save the combined database."""
+    """
+    Save the combined database (written to a temp file, synced, then
+    swapped in, so a crash leaves either the old or the new file whole).
+    """
     combined_path = os.path.join(output_dir, COMBINED_FILE)
-    with open(combined_path, "w", encoding="utf-8") as f:
-        json.dump(all_data, f, indent=4, ensure_ascii=False)
+    tmp_path = f"{combined_path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(orjson.dumps(all_data, option=orjson.OPT_INDENT_2))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, combined_path)
+
+
+def _is_blocked(request):
+    """True if a request is for something extract_programme_data() never reads."""
+    if request.resource_type in BLOCKED_RESOURCE_TYPES:
+        return True
+    url = request.url
+    if url.startswith(BLOCKED_HOSTS):
+        return True
+    host = url.split("://", 1)[-1].split("/", 1)[0]
+    return host.endswith(BLOCKED_HOST_SUFFIXES)
+
+
+async def block_unneeded_requests(route):
+    """Route handler: abort blocked requests, let everything else through."""
+    if _is_blocked(route.request):
+        await route.abort()
+    else:
+        await route.continue_()
+
+
+async def scrape_page(page, url):
+    """Load one programme page, expand its foldable sections and extract it."""
+    # The DOM is all we query, so don't wait for the network to go idle —
+    # just for the page's scripts to render the content block the extractor
+    # reads. If it never appears, extract whatever did render.
+    await page.goto(url, wait_until="domcontentloaded", timeout=30000)
+    try:
+        await page.wait_for_selector(CONTENT_SELECTOR, timeout=10000)
+    except Exception:
+        pass
 
+    # Expand all foldable sections in one in-page sweep, then give any
+    # expand transitions a moment to finish
+    try:
+        await page.evaluate(JS_EXPAND)
+        await page.wait_for_timeout(300)
+    except Exception:
+        pass
 
-if __name__ == "__main__":
-    # Load URLs
-    with open(URLS_FILE, "r") as f:
-        urls = json.load(f)
+    return await extract_programme_data(page, url)
+
+
+def load_algolia_data():
+    """Load the harvester's Algolia metadata, keyed by programme URL."""
+    if not os.path.exists(ALGOLIA_DATA_FILE):
+        return {}
+    with open(ALGOLIA_DATA_FILE, "rb") as f:
+        return {hit["url"]: hit for hit in orjson.loads(f.read())}
+
+
+def record_from_algolia(hit):
+    """Build a programme record (same shape as extract_programme_data) from an Algolia hit."""
+    key_facts = {}
+    for key, field in (("format", "format"), ("location", "location"),
+                       ("start_date", "start_period")):
+        if hit.get(field):
+            key_facts[key] = ", ".join(hit[field])
+    return {
+        "url": hit["url"],
+        "source": ALGOLIA_SOURCE,
+        "title": hit.get("title", ""),
+        "subtitle": "",
+        "key_facts": key_facts,
+        "description": hit.get("description", ""),
+        "field_of_interest": hit.get("field_of_interest", []),
+        "programme_type": hit.get("programme_type", []),
+        "experience_level": hit.get("experience_level", []),
+        "sections": [],
+        "foldable_sections": [],
+        "testimonials": [],
+        "contact": {},
+        "full_text": hit.get("description", ""),
+    }
 
-    print(f"{'=' * 60}")
-    print(f"  Vlerick Programme Scraper")
-    print(f"  {len(urls)} programmes to scrape")
-    print(f"{'=' * 60}")
 
-    # Create output directory
-    os.makedirs(OUTPUT_DIR, exist_ok=True)
+def record(data, all_data, journal):
+    """
+    Keep one result, journal it, and periodically rebuild the combined JSON.
 
-    # Load any previously scraped data (for resume support)
-    already_scraped = load_progress(OUTPUT_DIR)
-    all_data = []
-    combined_path = os.path.join(OUTPUT_DIR, COMBINED_FILE)
-    if os.path.exists(combined_path):
-        with open(combined_path, "r", encoding="utf-8") as f:
-            all_data = json.load(f)
+    Each record is flushed to the OS straight away, but only fsynced to
+    disk in groups: every SAVE_EVERY records, together with the combined
+    rebuild, and once more at the end of the run.
+    """
+    all_data.append(data)
+    append_record(journal, data)
+    if len(all_data) % SAVE_EVERY == 0:
+        sync_journal(journal)
+        save_combined(all_data, OUTPUT_DIR)
 
-    remaining = [u for u in urls if u not in already_scraped]
-    if already_scraped:
-        print(f"  Resuming: {len(already_scraped)} already done, {len(remaining)} remaining\n")
 
-    with sync_playwright() as p:
-        browser = p.chromium.launch(headless=True)
-        context = browser.new_context(
-            user_agent=(
-                "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
-                "AppleWebKit/537.36 (KHTML, like Gecko) "
-                "Chrome/120.0.0.0 Safari/537.36"
-            )
-        )
-        page = context.new_page()
-
-        for i, url in enumerate(remaining, 1):
-            prog_name = url.rstrip("/").split("/")[-1]
-            print(f"[{i}/{len(remaining)}] Scraping: {prog_name}...")
+async def new_context(browser):
+    """Open a browser context with request blocking, and a page in it."""
+    context = await browser.new_context(user_agent=USER_AGENT)
+    await context.route("**/*", block_unneeded_requests)
+    page = await context.new_page()
+    return context, page
+
+
+async def worker(browser, queue, all_data, journal, lock, progress):
+    """
+    Scrape URLs from the queue until it is empty.
 
+    Each worker has its own browser context and page, reused for its URLs
+    and replaced every PAGES_PER_CONTEXT pages. Results are appended to
+    all_data and the journal under `lock`, so only one worker writes at a
+    time; every SAVE_EVERY records the combined database is rebuilt too.
+    """
+    context, page = await new_context(browser)
+    pages_done = 0
+    try:
+        while True:
             try:
-                page.goto(url, wait_until="networkidle", timeout=30000)
-                page.wait_for_timeout(2000)
+                url = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                break
 
-                # Scroll down to trigger lazy-loaded content
-                page.evaluate("window.scrollTo(0, document.body.scrollHeight)")
-                page.wait_for_timeout(1000)
-                page.evaluate("window.scrollTo(0, 0)")
-                page.wait_for_timeout(500)
+            if pages_done == PAGES_PER_CONTEXT:
+                await context.close()
+                context, page = await new_context(browser)
+                pages_done = 0
+            pages_done += 1
 
-                # Try to expand all foldable sections
-                try:
-                    expand_buttons = page.locator(
-                        "[class*='foldable'] button, "
-                        "[class*='accordion'] button, "
-                        "button[aria-expanded='false']"
-                    )
-                    for j in range(expand_buttons.count()):
-                        try:
-                            expand_buttons.nth(j).click(timeout=500)
-                            page.wait_for_timeout(200)
-                        except Exception:
-                            pass
-                except Exception:
-                    pass
+            progress["started"] += 1
+            prog_name = url.rstrip("/").split("/")[-1]
+            print(f"[{progress['started']}/{progress['total']}] Scraping: {prog_name}...")
 
+            try:
                 # Extract data
-                data = extract_programme_data(page, url)
+                data = await scrape_page(page, url)
 
                 # Save individual files
                 json_path, txt_path = save_programme_file(data, OUTPUT_DIR)
 
-                # Add to combined and save immediately
-                all_data.append(data)
-                save_combined(all_data, OUTPUT_DIR)
+                # Add to the journal immediately
+                async with lock:
+                    record(data, all_data, journal)
 
                 print(f"         Saved: {json_path}")
 
             except Exception as e:
-                print(f"         ERROR: {e}")
+                print(f"         ERROR ({prog_name}): {e}")
                 # Save error record so we know it failed
-                all_data.append({"url": url, "error": str(e)})
-                save_combined(all_data, OUTPUT_DIR)
+                async with lock:
+                    record({"url": url, "error": str(e)}, all_data, journal)
 
             # Small delay between requests
-            time.sleep(1)
+            await asyncio.sleep(PAGE_DELAY)
+    finally:
+        await context.close()
+
+
+async def main():
+    # Load URLs
+    with open(URLS_FILE, "rb") as f:
+        urls = orjson.loads(f.read())
+
+    print(f"{'=' * 60}")
+    print(f"  Vlerick Programme Scraper")
+    print(f"  {len(urls)} programmes to scrape")
+    print(f"{'=' * 60}")
+
+    # Create output directory
+    os.makedirs(OUTPUT_DIR, exist_ok=True)
 
-        browser.close()
+    # Load any previously scraped data (for resume support). The latest
+    # record per URL wins; outside FAST_MODE, Algolia-only records don't
+    # count as done, so those pages get scraped in full.
+    by_url = {}
+    for item in load_progress(OUTPUT_DIR):
+        if FAST_MODE or item.get("source") != ALGOLIA_SOURCE:
+            by_url[item.get("url", "")] = item
+    all_data = list(by_url.values())
+    already_scraped = set(by_url)
+
+    remaining = [u for u in urls if u not in already_scraped]
+    if already_scraped:
+        print(f"  Resuming: {len(already_scraped)} already done, {len(remaining)} remaining\n")
+
+    journal_path = os.path.join(OUTPUT_DIR, JOURNAL_FILE)
+    with open(journal_path, "ab") as journal:
+        # FAST_MODE: programmes with Algolia metadata need no page load
+        if FAST_MODE:
+            algolia_by_url = load_algolia_data()
+            to_browse = []
+            for url in remaining:
+                hit = algolia_by_url.get(url)
+                if hit is None:
+                    to_browse.append(url)
+                    continue
+                data = record_from_algolia(hit)
+                save_programme_file(data, OUTPUT_DIR)
+                record(data, all_data, journal)
+            print(f"  Fast mode: {len(remaining) - len(to_browse)} from Algolia data, "
+                  f"{len(to_browse)} to scrape\n")
+            remaining = to_browse
+
+        queue = asyncio.Queue()
+        for url in remaining:
+            queue.put_nowait(url)
+        lock = asyncio.Lock()
+        progress = {"started": 0, "total": len(remaining)}
+
+        if remaining:
+            async with async_playwright() as p:
+                browser = await p.chromium.launch(headless=True)
+                await asyncio.gather(*(
+                    worker(browser, queue, all_data, journal, lock, progress)
+                    for _ in range(min(CONCURRENCY, len(remaining)))
+                ))
+                await browser.close()
+
+        sync_journal(journal)
+
+    # Rebuild the combined JSON from every record
+    save_combined(all_data, OUTPUT_DIR)
 
     # Final summary
     success = sum(1 for d in all_data if "error" not in d)
@@ -372,3 +734,7 @@ if __name__ == "__main__":
     print(f"  Files saved to: {OUTPUT_DIR}/")
     print(f"  Combined DB:    {OUTPUT_DIR}/{COMBINED_FILE}")
     print(f"{'=' * 60}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -6,9 +6,12 @@ JavaScript bundle (search-only key).
 """
 
 import json
-import time
+import math
+from concurrent.futures import ThreadPoolExecutor
 import requests
-from bs4 import BeautifulSoup
+from lxml import html as lxml_html
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 BASE_URL = "https://www.vlerick.com"
 
@@ -20,11 +23,44 @@ ALGOLIA_SEARCH_URL = (
     f"https://{ALGOLIA_APP_ID}-dsn.algolia.net/1/indexes/{ALGOLIA_INDEX}/query"
 )
 
+# Requests made at once when fetching Algolia result pages / domain pages.
+# They're independent, so fetching them concurrently overlaps the latency.
+MAX_WORKERS = 8
+
+# href of every link to a programme page on a domain page
+PROGRAMME_LINKS_XPATH = '//a[contains(@href, "/programmes/programmes-in-")]/@href'
+
+# One shared session for every request, so repeat requests to Algolia and
+# vlerick.com reuse keep-alive connections instead of a new TCP + TLS
+# handshake each time. The pool is sized for MAX_WORKERS threads, and
+# transient failures (connection errors, 429, 5xx) are retried with backoff.
+# The Algolia query is a read, so retrying its POST is safe.
+SESSION = requests.Session()
+SESSION.headers.update({
+    "User-Agent": (
+        "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
+        "AppleWebKit/537.36 (KHTML, like Gecko) "
+        "Chrome/120.0.0.0 Safari/537.36"
+    )
+})
+_adapter = HTTPAdapter(
+    pool_connections=16,
+    pool_maxsize=16,
+    max_retries=Retry(
+        total=3,
+        backoff_factor=0.3,
+        status_forcelist=(429, 500, 502, 503, 504),
+        allowed_methods=None,
+    ),
+)
+SESSION.mount("https://", _adapter)
+SESSION.mount("http://", _adapter)
 
-def query_algolia(filters="", hits_per_page=200):
+
+def query_algolia(filters="", hits_per_page=200, page=0, verbose=True):
     """
     Query the Algolia search API directly.
-    Returns all hits matching the filter.
+    Returns one page (0-based) of the hits matching the filter.
     """
     headers = {
         "X-Algolia-Application-Id": ALGOLIA_APP_ID,
@@ -32,15 +68,16 @@ def query_algolia(filters="", hits_per_page=200):
         "Content-Type": "application/json",
     }
     payload = {
-        "params": f"hitsPerPage={hits_per_page}&filters={filters}"
+        "params": f"hitsPerPage={hits_per_page}&page={page}&filters={filters}"
     }
 
-    resp = requests.post(ALGOLIA_SEARCH_URL, headers=headers, json=payload, timeout=30)
+    resp = SESSION.post(ALGOLIA_SEARCH_URL, headers=headers, json=payload, timeout=30)
     resp.raise_for_status()
     data = resp.json()
 
-    print(f"   Algolia returned {data.get('nbHits', 0)} total hits, "
-          f"got {len(data.get('hits', []))} in this page")
+    if verbose:
+        print(f"   Algolia returned {data.get('nbHits', 0)} total hits, "
+              f"got {len(data.get('hits', []))} in this page")
 
     return data
 
@@ -54,38 +91,27 @@ def harvest_from_algolia():
     all_hits = []
 
     # Query 1: All Executive Education programmes
+    exec_ed_filter = 'programme_type:"Executive Education"'
     print("   Query: Executive Education programmes...")
-    data = query_algolia(
-        filters='programme_type:"Executive Education"',
-        hits_per_page=500
-    )
+    data = query_algolia(filters=exec_ed_filter, hits_per_page=500)
     all_hits.extend(data.get("hits", []))
 
-    # If there are more hits than returned, paginate
+    # If there are more hits than returned, fetch the remaining pages
+    # concurrently — once the first page gives the total, they're independent
     total_hits = data.get("nbHits", 0)
     if total_hits > len(data.get("hits", [])):
-        page = 1
-        while len(all_hits) < total_hits:
-            print(f"   Fetching page {page + 1}...")
-            headers = {
-                "X-Algolia-Application-Id": ALGOLIA_APP_ID,
-                "X-Algolia-API-Key": ALGOLIA_API_KEY,
-                "Content-Type": "application/json",
-            }
-            payload = {
-                "params": f"hitsPerPage=500&page={page}"
-                          f'&filters=programme_type:"Executive Education"'
-            }
-            resp = requests.post(
-                ALGOLIA_SEARCH_URL, headers=headers, json=payload, timeout=30
+        n_pages = math.ceil(total_hits / 500)
+        print(f"   Fetching pages 2-{n_pages}...")
+        with ThreadPoolExecutor(max_workers=MAX_WORKERS) as pool:
+            pages = pool.map(
+                lambda page: query_algolia(
+                    filters=exec_ed_filter, hits_per_page=500, page=page,
+                    verbose=False,
+                ),
+                range(1, n_pages),
             )
-            resp.raise_for_status()
-            page_data = resp.json()
-            hits = page_data.get("hits", [])
-            if not hits:
-                break
-            all_hits.extend(hits)
-            page += 1
+            for page_data in pages:
+                all_hits.extend(page_data.get("hits", []))
 
     # Query 2: Also try without filter to catch any programmes not tagged
     print("   Query: All programmes (unfiltered)...")
@@ -145,32 +171,30 @@ def fallback_static_harvest():
         "https://www.vlerick.com/en/vlerick-entrepreneurship-academy/",
     ]
 
-    headers = {
-        "User-Agent": (
-            "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
-            "AppleWebKit/537.36 (KHTML, like Gecko) "
-            "Chrome/120.0.0.0 Safari/537.36"
-        )
-    }
-    urls = set()
-
-    for domain_url in DOMAIN_URLS:
+    def fetch_links(domain_url):
+        """Return the programme links found on one domain page."""
+        links = set()
         try:
-            resp = requests.get(domain_url, headers=headers, timeout=10)
+            resp = SESSION.get(domain_url, timeout=10)
             if resp.status_code != 200:
-                continue
-            soup = BeautifulSoup(resp.content, "html.parser")
-            for a in soup.find_all("a", href=True):
-                href = a["href"]
-                if "/programmes/programmes-in-" in href:
-                    if href.startswith("/"):
-                        href = BASE_URL + href
-                    clean_url = href.split("#")[0].split("?")[0]
-                    if not clean_url.endswith("/brochure/"):
-                        urls.add(clean_url)
+                return links
+            # lxml's C parser, with the link filter done in the XPath query
+            doc = lxml_html.fromstring(resp.content)
+            for href in doc.xpath(PROGRAMME_LINKS_XPATH):
+                if href.startswith("/"):
+                    href = BASE_URL + href
+                clean_url = href.split("#")[0].split("?")[0]
+                if not clean_url.endswith("/brochure/"):
+                    links.add(clean_url)
         except Exception as e:
             print(f"  Warning: Failed to fetch {domain_url}: {e}")
-        time.sleep(0.5)
+        return links
+
+    # The domain pages are independent, so fetch them concurrently
+    urls = set()
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as pool:
+        for links in pool.map(fetch_links, DOMAIN_URLS):
+            urls |= links
 
     return urls
 
@@ -193,11 +217,13 @@ if __name__ == "__main__":
     # Merge and deduplicate
     all_urls = algolia_urls | static_urls
 
+    # Split each URL's path once; the cleanup and the category listing
+    # below both work from these segments
+    segments_by_url = {url: url.rstrip("/").split("/") for url in all_urls}
+
     # Final cleanup: remove category-level pages (no programme name)
     clean_urls = set()
-    for url in all_urls:
-        path = url.rstrip("/")
-        segments = path.split("/")
+    for url, segments in segments_by_url.items():
         # Must have: ...programmes-in-{category}/{programme-name}
         # That means at least 7 segments for a full URL
         if len(segments) >= 7:
@@ -248,7 +274,7 @@ if __name__ == "__main__":
     from collections import defaultdict
     categories = defaultdict(list)
     for url in sorted_urls:
-        parts = url.rstrip("/").split("/")
+        parts = segments_by_url[url]
         cat = parts[5] if len(parts) > 5 else "other"
         cat = cat.replace("programmes-in-", "").replace("-", " ").title()
         categories[cat].append(url)
@@ -256,6 +282,6 @@ if __name__ == "__main__":
     for cat in sorted(categories):
         print(f"\n  [{cat}] ({len(categories[cat])} programmes)")
         for url in categories[cat]:
-            name = url.rstrip("/").split("/")[-1].replace("-", " ").title()
+            name = segments_by_url[url][-1].replace("-", " ").title()
             print(f"    - {name}")
             print(f"      {url}")